@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from mftool import Mftool
-from matplotlib.backends.backend_pdf import PdfPages
-import io
+import os
+from nav_store import NavStore
+from seasonality import CHARTS
+from pdf_export import PageCache, PdfExport, MAX_PDF_PAGES
+from pipeline import make_render_pool, run_pipeline
+from scheme_search import SchemeSearchIndex
+from render_cache import RenderCache
+
+SEARCH_LIMIT = 25
 
 @st.cache_data(show_spinner=False)
 def get_scheme_codes():
@@ -15,111 +19,105 @@ def get_scheme_codes():
     df = pd.DataFrame(list(codes.items()), columns=["Scheme Code", "Scheme Name"])
     return df
 
-def fetch_data(scheme_code):
-    mf = Mftool()
-    df = mf.get_scheme_historical_nav(scheme_code, as_Dataframe=True)
-    df = df.reset_index()
-    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
-    df['nav'] = df['nav'].astype(float)
-    df = df.sort_values('date')
-    df.set_index('date', inplace=True)
-    monthly_nav = df['nav'].resample('M').last()
-    monthly_returns = monthly_nav.pct_change().dropna() * 100
-    monthly_returns_df = monthly_returns.to_frame(name='Monthly Return')
-    monthly_returns_df.reset_index(inplace=True)
-    return monthly_returns_df
+# Built once per server from the cached scheme list; only search hits are sent to the browser
+@st.cache_resource(show_spinner=False)
+def get_scheme_index(scheme_names):
+    return SchemeSearchIndex(scheme_names)
+
+@st.cache_resource(show_spinner=False)
+def get_nav_store(offline=False):
+    return NavStore(offline=offline)
+
+@st.cache_resource(show_spinner=False)
+def get_page_cache():
+    return PageCache()
 
-def seasonality1(monthly_returns_df, Name, ax=None):
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    monthly_returns_df['Year'] = monthly_returns_df['date'].dt.year
-    monthly_returns_df['Month'] = monthly_returns_df['date'].dt.strftime('%b')
-    monthly_returns_df['Month_num'] = monthly_returns_df['date'].dt.month
-    pivot_df = monthly_returns_df.pivot(index='Year', columns='Month', values='Monthly Return')
-    pivot_df = pivot_df[months]
-    avg_row = pd.DataFrame(pivot_df.mean(numeric_only=True), columns=['Average Monthly Performance']).T
-    pivot_df = pd.concat([avg_row, pivot_df], axis=0)
-    pivot_df = pivot_df.reindex(pivot_df.index.tolist() + ['neg_count'])
-    neg_counts = (pivot_df.iloc[1:] < 0).sum()
-    pivot_df.loc['neg_count'] = neg_counts
-    if ax is None:
-        ax = plt.gca()
-    sns.heatmap(
-        pivot_df,
-        annot=True,
-        fmt='.2f',
-        center=0,
-        cmap="RdYlGn",
-        linewidths=0.5,
-        linecolor='gray',
-        cbar=True,
-        vmin=-20, vmax=20,
-        ax=ax
-    )
-    ax.set_title(f'Seasonality Analysis: {Name}', fontsize=16)
-    ax.set_yticklabels(ax.get_yticklabels(), rotation=0)
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+# Shared by all sessions, so a scheme rendered for one user is reused by the next
+@st.cache_resource(show_spinner=False)
+def get_render_cache():
+    return RenderCache()
 
-def seasonality2(monthly_returns_df, Name, ax=None):
-    monthly_returns_df['Month'] = monthly_returns_df['date'].dt.strftime('%B')
-    avg_monthly_returns = monthly_returns_df.groupby('Month')['Monthly Return'].mean()
-    months_order = ['January', 'February', 'March', 'April', 'May', 'June',
-                    'July', 'August', 'September', 'October', 'November', 'December']
-    avg_monthly_returns = avg_monthly_returns.reindex(months_order)
-    if ax is None:
-        ax = plt.gca()
-    sns.barplot(x=avg_monthly_returns.index, y=avg_monthly_returns.values, palette='viridis', ax=ax)
-    ax.set_title(f'Avg Monthly Returns {Name}')
-    ax.set_ylabel('Average Return (%)')
-    ax.set_xlabel('Month')
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+# One long-lived pool per server, so reruns do not pay the worker start-up cost
+@st.cache_resource(show_spinner=False)
+def get_render_pool():
+    return make_render_pool()
+
+# Merged PDF of the selected schemes' cached pages, via a temporary file
+def read_pdf(pdf_export, scheme_codes):
+    pdf_path = pdf_export.write(scheme_codes)
+    try:
+        with open(pdf_path, 'rb') as pdf_file:
+            return pdf_file.read()
+    finally:
+        os.remove(pdf_path)
 
 st.title("Mutual Fund Seasonality Visualizer")
 
+offline = st.sidebar.checkbox(
+    "Offline mode (use stored NAVs only)",
+    value=os.environ.get("MF_NAV_OFFLINE", "0") == "1"
+)
+nav_store = get_nav_store(offline)
+max_pdf_pages = st.sidebar.number_input("Max pages in PDF export", min_value=2, value=MAX_PDF_PAGES, step=2)
+
 scheme_df = get_scheme_codes()
-scheme_names = scheme_df['Scheme Name'].tolist()
+scheme_index = get_scheme_index(tuple(scheme_df['Scheme Name']))
+if 'selected_names' not in st.session_state:
+    st.session_state.selected_names = []
+query = st.text_input("Search mutual fund schemes (e.g. \"parag flexi direct\"):")
+matches = scheme_index.search(query, k=SEARCH_LIMIT)
+# Keep earlier picks selectable while the search results change
+options = list(dict.fromkeys(st.session_state.selected_names + matches))
 selected_names = st.multiselect(
-    "Search and select one or more mutual fund schemes:",
-    options=scheme_names,
-    default=[]
+    "Select one or more mutual fund schemes:",
+    options=options,
+    key='selected_names'
 )
-selected_codes = scheme_df[scheme_df['Scheme Name'].isin(selected_names)]['Scheme Code'].tolist()
-
-if selected_codes:
-    pdf_buffer = io.BytesIO()
-    with PdfPages(pdf_buffer) as pdf:
-        for code, name in zip(selected_codes, selected_names):
-            st.subheader(f"Visualizations for: {name}")
+name_to_code = dict(zip(scheme_df['Scheme Name'], scheme_df['Scheme Code']))
+selected = [(name_to_code[name], name) for name in selected_names]
 
-            st.write("#### Seasonality Heatmap")
-            fig1, ax1 = plt.subplots(figsize=(12, 6))
-            try:
-                df = fetch_data(code)
-                seasonality1(df, name, ax=ax1)
-                st.pyplot(fig1)
-                pdf.savefig(fig1)
-            except Exception as e:
-                st.warning(f"Could not plot heatmap for {name}: {e}")
-            plt.close(fig1)
+if selected:
+    # Reserve a section per scheme up front so results keep the selection order as they stream in
+    sections = {}
+    for code, name in selected:
+        section = st.container()
+        section.subheader(f"Visualizations for: {name}")
+        sections[code] = section.empty()
+    pdf_export = PdfExport(get_page_cache(), max_pages=max_pdf_pages)
 
-            st.write("#### Average Monthly Returns")
-            fig2, ax2 = plt.subplots(figsize=(10, 5))
-            try:
-                seasonality2(df, name, ax=ax2)
-                st.pyplot(fig2)
-                pdf.savefig(fig2)
-            except Exception as e:
-                st.warning(f"Could not plot barplot for {name}: {e}")
-            plt.close(fig2)
+    for code, name, charts, version, error in run_pipeline(selected, nav_store, get_render_pool(),
+                                                           render_cache=get_render_cache()):
+        section = sections[code].container()
+        if error is not None:
+            section.warning(f"Could not load data for {name}: {error}")
+            continue
+        for key, title, _, _ in CHARTS:
+            section.write(f"#### {title}")
+            chart = charts[key]
+            if chart['error'] is not None:
+                section.warning(f"Could not plot {title.lower()} for {name}: {chart['error']}")
+                continue
+            section.image(chart['png'])
+            # Filed under the version of the data this page was drawn from
+            pdf_export.add_page(code, version, key, chart['pdf'])
 
-    pdf_buffer.seek(0)
-    st.download_button(
-        label="Download all charts as PDF",
-        data=pdf_buffer,
-        file_name="seasonality_charts.pdf",
-        mime="application/pdf"
-    )
+    if pdf_export.page_count:
+        selected_codes = [code for code, _ in selected]
+        _, dropped = pdf_export.ordered_pages(selected_codes)
+        # Deferred: the pages stay on disk and are only merged when the button is clicked.
+        # Streamlit serves download data from memory, so the merged PDF is held for that click only.
+        st.download_button(
+            label="Download all charts as PDF",
+            data=lambda: read_pdf(pdf_export, selected_codes),
+            file_name="seasonality_charts.pdf",
+            mime="application/pdf"
+        )
+        if dropped:
+            st.caption(f"PDF limited to {max_pdf_pages} pages; {dropped} page(s) left out.")
 else:
     st.info("Search and select one or more schemes above to see visualizations.")
+    if query and not matches:
+        st.caption(f"No schemes match \"{query}\".")
 
 st.markdown("---")
-st.caption("Powered by mftool, pandas, seaborn, matplotlib, and Streamlit.")
\ No newline at end of file
+st.caption("Powered by mftool, pandas, seaborn, matplotlib, and Streamlit.")
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import requests
+from tqdm import tqdm
+
+from nav_store import NavStore, DEFAULT_STORE_PATH
+from seasonality import fetch_data, render_scheme, merge_pdf_pages
+
+# Headless seasonality report generator. Reuses fetch_data / seasonality1 / seasonality2 through
+# render_scheme(), renders schemes across a process pool and writes one PDF per scheme or per
+# AMFI category. Every finished scheme is appended to progress.jsonl in the output directory, so
+# a rerun skips completed schemes and retries only the failed or missing ones.
+#
+#   python batch_report.py --codes 122639 118989 --out reports
+#   python batch_report.py --category "Equity Scheme - Flexi Cap Fund" --per category --out reports
+
+AMFI_NAV_URL = "https://www.amfiindia.com/spages/NAVAll.txt"
+PROGRESS_FILE = "progress.jsonl"
+
+
+def slugify(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_')
+
+
+# NAVAll.txt lists schemes under headers such as "Open Ended Schemes(Equity Scheme - Large Cap Fund)"
+def amfi_schemes_by_category(timeout=60):
+    response = requests.get(AMFI_NAV_URL, timeout=timeout)
+    response.raise_for_status()
+    categories = {}
+    category = None
+    for line in response.text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if ';' in line:
+            fields = line.split(';')
+            if category is not None and fields[0].isdigit() and len(fields) > 3:
+                categories.setdefault(category, []).append((int(fields[0]), fields[3].strip()))
+        elif '(' in line and line.endswith(')'):
+            category = line[line.index('(') + 1:-1].strip()
+    return categories
+
+
+def select_category(categories, wanted):
+    wanted = wanted.lower()
+    return {name: schemes for name, schemes in categories.items() if wanted in name.lower()}
+
+
+def scheme_names(codes):
+    try:
+        from mftool import Mftool
+        all_codes = Mftool().get_scheme_codes()
+        return {code: all_codes.get(str(code), str(code)) for code in codes}
+    except Exception:
+        return {code: str(code) for code in codes}
+
+
+def load_progress(out_dir):
+    path = os.path.join(out_dir, PROGRESS_FILE)
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a run killed mid-write leaves a partial last line
+                done[record['code']] = record
+    return {code: record for code, record in done.items() if record['status'] == 'ok'}
+
+
+def write_pdf(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Runs in a worker process: fetch, render both charts, write the scheme's PDF
+def build_scheme_pdf(code, name, out_path, store_path, offline):
+    store = NavStore(store_path, offline=offline)
+    monthly_returns_df = fetch_data(code, store)
+    charts = render_scheme(monthly_returns_df, name)
+    pages = [chart['pdf'] for chart in charts.values() if chart['pdf'] is not None]
+    errors = {key: chart['error'] for key, chart in charts.items() if chart['error'] is not None}
+    if not pages:
+        raise RuntimeError(f"no charts rendered: {errors}")
+    write_pdf(out_path, merge_pdf_pages(pages))
+    return errors
+
+
+def run_batch(groups, out_dir, per='scheme', workers=None, store_path=DEFAULT_STORE_PATH, offline=False):
+    os.makedirs(out_dir, exist_ok=True)
+    page_dir = out_dir if per == 'scheme' else os.path.join(out_dir, 'pages')
+    os.makedirs(page_dir, exist_ok=True)
+    completed = load_progress(out_dir)
+
+    tasks = {}
+    for schemes in groups.values():
+        for code, name in schemes:
+            out_path = os.path.join(page_dir, f"{code}.pdf")
+            if code in completed and os.path.exists(out_path):
+                continue
+            tasks[code] = (name, out_path)
+
+    failed = {}
+    with open(os.path.join(out_dir, PROGRESS_FILE), 'a') as progress, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(build_scheme_pdf, code, name, out_path, store_path, offline): code
+            for code, (name, out_path) in tasks.items()
+        }
+        with tqdm(total=len(futures), desc="Rendering schemes",
+                  postfix={'skipped': sum(len(s) for s in groups.values()) - len(tasks)}) as pbar:
+            for future in as_completed(futures):
+                code = futures[future]
+                try:
+                    chart_errors = future.result()
+                    record = {'code': code, 'status': 'ok', 'chart_errors': chart_errors}
+                except Exception as e:
+                    record = {'code': code, 'status': 'failed', 'error': str(e)}
+                    failed[code] = str(e)
+                    tqdm.write(f"Failed for {code}: {e}")
+                progress.write(json.dumps(record) + '\n')
+                progress.flush()
+                pbar.update(1)
+
+    if per == 'category':
+        for category, schemes in tqdm(groups.items(), desc="Writing category reports"):
+            pages = [os.path.join(page_dir, f"{code}.pdf") for code, _ in schemes]
+            pages = [path for path in pages if os.path.exists(path)]
+            if not pages:
+                continue
+            data = []
+            for path in pages:
+                with open(path, 'rb') as f:
+                    data.append(f.read())
+            write_pdf(os.path.join(out_dir, f"{slugify(category)}.pdf"), merge_pdf_pages(data))
+
+    return failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate seasonality PDF reports without the Streamlit page.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--codes', nargs='+', type=int, help="scheme codes to report on")
+    source.add_argument('--codes-file', help="file with one scheme code per line")
+    source.add_argument('--category', help="AMFI category name or substring, e.g. 'Flexi Cap'")
+    parser.add_argument('--per', choices=['scheme', 'category'], default='scheme',
+                        help="write one PDF per scheme (default) or one per category")
+    parser.add_argument('--out', default='reports', help="output directory")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help="NAV store file")
+    parser.add_argument('--offline', action='store_true', help="use stored NAVs only")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.category:
+        groups = select_category(amfi_schemes_by_category(), args.category)
+        if not groups:
+            print(f"No AMFI category matches '{args.category}'")
+            return 1
+    else:
+        if args.codes_file:
+            with open(args.codes_file) as f:
+                codes = [int(line.strip()) for line in f if line.strip()]
+        else:
+            codes = args.codes
+        names = scheme_names(codes)
+        groups = {'Selected schemes': [(code, names[code]) for code in codes]}
+
+    print(f"{sum(len(s) for s in groups.values())} schemes in {len(groups)} group(s)")
+    failed = run_batch(groups, args.out, args.per, args.workers, args.store, args.offline)
+    print(f"Finished with {len(failed)} failed scheme(s); rerun the same command to retry them")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
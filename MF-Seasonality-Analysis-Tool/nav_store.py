@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pandas as pd
+import requests
+
+# Local NAV store: one SQLite file holding the full NAV history of every scheme that has been
+# requested, keyed by scheme code. Only NAVs newer than the last stored date are downloaded
+# on refresh, and in offline mode the network is never touched.
+
+MFAPI_URL = "https://api.mfapi.in/mf/{}"
+DEFAULT_STORE_PATH = os.environ.get(
+    "MF_NAV_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nav_store.sqlite")
+)
+# AMFI publishes one NAV per business day, so a scheme checked recently is not re-queried
+REFRESH_INTERVAL = 6 * 60 * 60
+
+
+def download_nav(scheme_code, start_date=None, timeout=30):
+    params = {'startDate': start_date.strftime('%Y-%m-%d')} if start_date is not None else None
+    response = requests.get(MFAPI_URL.format(scheme_code), params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json().get('data') or []
+    df = pd.DataFrame(data, columns=['date', 'nav'])
+    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
+    df['nav'] = pd.to_numeric(df['nav'], errors='coerce')
+    df = df.dropna()
+    # Older API deployments ignore startDate and return the full history
+    if start_date is not None:
+        df = df[df['date'] > start_date]
+    return df.sort_values('date').reset_index(drop=True)
+
+
+class NavStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, offline=False, refresh_interval=REFRESH_INTERVAL):
+        self.path = path
+        self.offline = offline
+        self.refresh_interval = refresh_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    # A connection per call keeps the store safe to use from several threads
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def _init_schema(self):
+        with self._connect() as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nav ("
+                "scheme_code INTEGER NOT NULL, date TEXT NOT NULL, nav REAL NOT NULL, "
+                "PRIMARY KEY (scheme_code, date)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scheme_state ("
+                "scheme_code INTEGER PRIMARY KEY, last_nav_date TEXT, last_checked REAL)"
+            )
+
+    def _state(self, scheme_code):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT last_nav_date, last_checked FROM scheme_state WHERE scheme_code = ?",
+                (int(scheme_code),)
+            ).fetchone()
+        if row is None:
+            return None, None
+        last_nav_date = pd.Timestamp(row[0]) if row[0] else None
+        return last_nav_date, row[1]
+
+    def last_nav_date(self, scheme_code):
+        return self._state(scheme_code)[0]
+
+    def refresh(self, scheme_code, force=False):
+        if self.offline:
+            return 0
+        last_nav_date, last_checked = self._state(scheme_code)
+        if not force and last_checked is not None and time.time() - last_checked < self.refresh_interval:
+            return 0
+
+        new_rows = download_nav(scheme_code, last_nav_date)
+        if not new_rows.empty:
+            last_nav_date = new_rows['date'].max()
+        records = [(int(scheme_code), d.strftime('%Y-%m-%d'), float(v))
+                   for d, v in zip(new_rows['date'], new_rows['nav'])]
+        with self._connect() as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO nav (scheme_code, date, nav) VALUES (?, ?, ?)", records)
+            conn.execute(
+                "INSERT OR REPLACE INTO scheme_state (scheme_code, last_nav_date, last_checked) VALUES (?, ?, ?)",
+                (int(scheme_code), last_nav_date.strftime('%Y-%m-%d') if last_nav_date is not None else None, time.time())
+            )
+        return len(records)
+
+    def load(self, scheme_code):
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT date, nav FROM nav WHERE scheme_code = ? ORDER BY date",
+                conn, params=(int(scheme_code),)
+            )
+        df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+        return df.set_index('date')
+
+    def get_nav(self, scheme_code):
+        try:
+            self.refresh(scheme_code)
+        except requests.RequestException:
+            # Serve whatever is already on disk when the API is unreachable
+            if self.last_nav_date(scheme_code) is None:
+                raise
+        df = self.load(scheme_code)
+        if df.empty:
+            mode = "offline mode" if self.offline else "the NAV store"
+            raise ValueError(f"No NAV history available for scheme {scheme_code} in {mode}")
+        return df
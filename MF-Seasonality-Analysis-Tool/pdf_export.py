@@ -0,0 +1,104 @@
+import glob
+import os
+import tempfile
+import time
+
+from pypdf import PdfWriter
+
+# PDF export that never holds the whole document in memory while the page renders. Each chart
+# page is written to an on-disk page cache as soon as it is rendered, keyed by
+# (scheme code, data version, chart), and the download is assembled from those files at the
+# end. The data version is the fingerprint of the monthly returns the page was drawn from (see
+# render_cache.py), so a page always matches its data even if the NAV store refreshes meanwhile.
+# Re-exporting an unchanged selection therefore only concatenates pages already on disk.
+# Pages of other versions are not deleted when a new one is written: another session may still
+# have them listed for its download. Instead, pages unused for PAGE_CACHE_DAYS are evicted.
+
+PAGE_CACHE_DIR = os.environ.get(
+    "MF_PAGE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "page_cache")
+)
+MAX_PDF_PAGES = int(os.environ.get("MF_PDF_MAX_PAGES", "200"))
+PAGE_CACHE_DAYS = float(os.environ.get("MF_PAGE_CACHE_DAYS", "7"))
+# The eviction scan runs at most this often
+EVICT_INTERVAL = 3600
+
+
+class PageCache:
+    def __init__(self, directory=PAGE_CACHE_DIR, max_age_days=PAGE_CACHE_DAYS):
+        self.directory = directory
+        self.max_age = max_age_days * 86400
+        self._last_evicted = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, scheme_code, version, chart):
+        return os.path.join(self.directory, f"{scheme_code}_{version}_{chart}.pdf")
+
+    def get(self, scheme_code, version, chart):
+        path = self.path(scheme_code, version, chart)
+        try:
+            # The modification time doubles as the last use, which eviction goes by
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, scheme_code, version, chart, data):
+        path = self.path(scheme_code, version, chart)
+        # Unique temporary name: two sessions may render the same page at once
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    # Removes pages not used for max_age seconds
+    def evict(self, now=None):
+        now = time.time() if now is None else now
+        if now - self._last_evicted < EVICT_INTERVAL:
+            return
+        self._last_evicted = now
+        for path in glob.glob(os.path.join(self.directory, "*.pdf")):
+            try:
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class PdfExport:
+    def __init__(self, cache, max_pages=MAX_PDF_PAGES):
+        self.cache = cache
+        self.max_pages = max_pages
+        self._pages = {}
+
+    # Spools one rendered page to disk (or reuses the cached copy) and forgets the bytes
+    def add_page(self, scheme_code, version, chart, data=None):
+        path = self.cache.get(scheme_code, version, chart)
+        if path is None:
+            if data is None:
+                return False
+            path = self.cache.put(scheme_code, version, chart, data)
+        self._pages.setdefault(scheme_code, []).append(path)
+        return True
+
+    @property
+    def page_count(self):
+        return sum(len(paths) for paths in self._pages.values())
+
+    # Pages beyond max_pages (counted in scheme order) are left out of the document
+    def ordered_pages(self, scheme_codes):
+        pages = [path for code in scheme_codes for path in self._pages.get(code, [])]
+        return pages[:self.max_pages], max(0, len(pages) - self.max_pages)
+
+    # Concatenates the cached pages into a temporary file and returns its path (caller removes it)
+    def write(self, scheme_codes):
+        pages, _ = self.ordered_pages(scheme_codes)
+        writer = PdfWriter()
+        for path in pages:
+            writer.append(path)
+        fd, out_path = tempfile.mkstemp(suffix='.pdf', prefix='seasonality_')
+        with os.fdopen(fd, 'wb') as f:
+            writer.write(f)
+        writer.close()
+        return out_path
@@ -0,0 +1,56 @@
+import os
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from seasonality import fetch_data, render_scheme
+from render_cache import fingerprint
+
+# Fetches every selected scheme concurrently on a bounded thread pool and hands each finished
+# download to a process pool for rendering, so total latency tracks the slowest scheme
+# rather than the sum of all of them.
+
+FETCH_WORKERS = 8
+RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+# Spawned (not forked) workers, since the Streamlit server process runs its own threads
+def make_render_pool(max_workers=RENDER_WORKERS):
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context('spawn'))
+
+# Yields (code, name, charts, version, error) for each scheme in completion order.
+# charts is the render_scheme() dict and version the fingerprint of the monthly returns it was
+# drawn from; error is set instead when the NAV fetch or render failed.
+# With a render_cache, schemes whose monthly returns are unchanged skip rendering entirely.
+def run_pipeline(schemes, store=None, render_pool=None, fetch_workers=FETCH_WORKERS, render_cache=None):
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+        pending = {
+            fetch_pool.submit(fetch_data, code, store): ('fetch', code, name, None)
+            for code, name in schemes
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, code, name, version = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield code, name, None, version, e
+                    continue
+                if stage == 'render':
+                    if render_cache is not None:
+                        render_cache.put(render_cache.key(code, name, version), result)
+                    yield code, name, result, version, None
+                    continue
+
+                version = fingerprint(result)
+                if render_cache is not None:
+                    charts = render_cache.get(render_cache.key(code, name, version))
+                    if charts is not None:
+                        yield code, name, charts, version, None
+                        continue
+                if render_pool is not None:
+                    pending[render_pool.submit(render_scheme, result, name)] = ('render', code, name, version)
+                else:
+                    # pyplot is not thread-safe, so without a process pool render inline
+                    charts = render_scheme(result, name)
+                    if render_cache is not None:
+                        render_cache.put(render_cache.key(code, name, version), charts)
+                    yield code, name, charts, version, None
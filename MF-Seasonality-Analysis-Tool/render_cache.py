@@ -0,0 +1,66 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# In-memory LRU cache of rendered charts (PNG and PDF page bytes), keyed by scheme code, scheme
+# name and a fingerprint of the monthly-returns frame. Schemes whose data has not changed since
+# the last rerun are served from here and never reach the render pool.
+
+RENDER_CACHE_MB = int(os.environ.get("MF_RENDER_CACHE_MB", "256"))
+
+
+def fingerprint(monthly_returns_df):
+    hashed = pd.util.hash_pandas_object(monthly_returns_df, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+def charts_size(charts):
+    return sum(len(chart['png'] or b'') + len(chart['pdf'] or b'') for chart in charts.values())
+
+
+class RenderCache:
+    def __init__(self, max_bytes=RENDER_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Streamlit serves every session from its own thread
+        self._lock = threading.Lock()
+
+    # version is the fingerprint() of the scheme's monthly-returns frame
+    @staticmethod
+    def key(scheme_code, name, version):
+        return scheme_code, name, version
+
+    def get(self, key):
+        with self._lock:
+            charts = self._entries.get(key)
+            if charts is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return charts
+
+    def put(self, key, charts):
+        # Charts that failed to render are retried on the next rerun rather than cached
+        if any(chart['error'] is not None for chart in charts.values()):
+            return
+        size = charts_size(charts)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= charts_size(self._entries.pop(key))
+            self._entries[key] = charts
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= charts_size(evicted)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,86 @@
+import re
+import heapq
+from collections import defaultdict
+
+# Prefix index over AMFI scheme names for the scheme picker. Names are tokenized after
+# dropping plan/option noise ("Direct", "Growth", "IDCW", ...), every token prefix maps to the
+# set of schemes containing it, and a query is answered by intersecting the posting sets of its
+# tokens. Only the top-k matches are handed to the Streamlit widget.
+
+NOISE_TOKENS = {
+    'direct', 'regular', 'plan', 'option', 'growth', 'idcw', 'dividend', 'payout',
+    'reinvestment', 'div', 'reinvest', 'cumulative', 'fund', 'scheme', 'the', 'and', 'of',
+}
+MAX_PREFIX = 8
+# Broad prefixes ("s", "hd") can match thousands of schemes; only the shortest names among
+# them are ranked in full
+SCORE_LIMIT = 500
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def normalize(text):
+    return [token for token in tokenize(text) if token not in NOISE_TOKENS]
+
+
+class SchemeSearchIndex:
+    def __init__(self, names):
+        # Ids are assigned shortest name first, so a smaller id is a tighter match for a prefix
+        self.names = sorted(names, key=len)
+        self._tokens = []
+        self._raw_tokens = []
+        self._postings = defaultdict(set)
+        for i, name in enumerate(self.names):
+            tokens = normalize(name)
+            self._tokens.append(tokens)
+            self._raw_tokens.append(set(tokenize(name)))
+            for token in tokens:
+                for n in range(1, min(len(token), MAX_PREFIX) + 1):
+                    self._postings[token[:n]].add(i)
+
+    def _candidates(self, tokens):
+        postings = sorted((self._postings.get(token[:MAX_PREFIX], set()) for token in tokens), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        # Posting keys are capped at MAX_PREFIX characters, so longer query tokens need a check
+        long_tokens = [token for token in tokens if len(token) > MAX_PREFIX]
+        if long_tokens:
+            candidates = {
+                i for i in candidates
+                if all(any(t.startswith(token) for t in self._tokens[i]) for token in long_tokens)
+            }
+        return candidates
+
+    # Ranks whole-word matches first, then matches in the leading words of the name, then
+    # plan/option words from the query (e.g. "direct") that appear in the raw name, then shorter names.
+    def _score(self, i, tokens, noise):
+        name_tokens = self._tokens[i]
+        exact = sum(token in name_tokens for token in tokens)
+        position = sum(
+            next((p for p, t in enumerate(name_tokens) if t.startswith(token)), len(name_tokens))
+            for token in tokens
+        )
+        noise_hits = len(noise & self._raw_tokens[i])
+        return (-exact, position, -noise_hits, len(self.names[i]))
+
+    def search_indices(self, query, k=20):
+        raw = tokenize(query)
+        tokens = [token for token in raw if token not in NOISE_TOKENS]
+        noise = {token for token in raw if token in NOISE_TOKENS}
+        if not tokens:
+            return []
+        candidates = self._candidates(tokens)
+        if len(candidates) > SCORE_LIMIT:
+            candidates = heapq.nsmallest(SCORE_LIMIT, candidates)
+        return heapq.nsmallest(k, candidates, key=lambda i: self._score(i, tokens, noise))
+
+    def search(self, query, k=20):
+        return [self.names[i] for i in self.search_indices(query, k)]
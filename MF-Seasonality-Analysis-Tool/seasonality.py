@@ -0,0 +1,101 @@
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+from pypdf import PdfReader, PdfWriter
+import io
+from nav_store import NavStore
+from seasonality_engine import MONTHS, tensor_from_returns_frame, monthly_stats
+
+# Data loading and chart functions shared by the Streamlit page and the worker processes.
+# Nothing in this module may import streamlit, so it stays importable from spawned workers.
+
+def fetch_data(scheme_code, store=None):
+    store = store if store is not None else NavStore()
+    df = store.get_nav(scheme_code)
+    monthly_nav = df['nav'].resample('M').last()
+    monthly_returns = monthly_nav.pct_change().dropna() * 100
+    monthly_returns_df = monthly_returns.to_frame(name='Monthly Return')
+    monthly_returns_df.reset_index(inplace=True)
+    return monthly_returns_df
+
+def seasonality_pivot(monthly_returns_df):
+    _, years, tensor = tensor_from_returns_frame(monthly_returns_df)
+    stats = monthly_stats(tensor)
+    has_data = ~np.isnan(tensor[0]).all(axis=1)
+    pivot_df = pd.DataFrame(tensor[0][has_data], index=years[has_data], columns=MONTHS)
+    pivot_df.index.name = 'Year'
+    avg_row = pd.DataFrame([stats['mean'][0]], index=['Average Monthly Performance'], columns=MONTHS)
+    neg_row = pd.DataFrame([stats['neg_count'][0]], index=['neg_count'], columns=MONTHS, dtype=float)
+    return pd.concat([avg_row, pivot_df, neg_row], axis=0)
+
+def seasonality1(monthly_returns_df, Name, ax=None):
+    pivot_df = seasonality_pivot(monthly_returns_df)
+    if ax is None:
+        ax = plt.gca()
+    sns.heatmap(
+        pivot_df,
+        annot=True,
+        fmt='.2f',
+        center=0,
+        cmap="RdYlGn",
+        linewidths=0.5,
+        linecolor='gray',
+        cbar=True,
+        vmin=-20, vmax=20,
+        ax=ax
+    )
+    ax.set_title(f'Seasonality Analysis: {Name}', fontsize=16)
+    ax.set_yticklabels(ax.get_yticklabels(), rotation=0)
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+
+def seasonality2(monthly_returns_df, Name, ax=None):
+    _, _, tensor = tensor_from_returns_frame(monthly_returns_df)
+    months_order = ['January', 'February', 'March', 'April', 'May', 'June',
+                    'July', 'August', 'September', 'October', 'November', 'December']
+    avg_monthly_returns = pd.Series(monthly_stats(tensor)['mean'][0], index=months_order)
+    if ax is None:
+        ax = plt.gca()
+    sns.barplot(x=avg_monthly_returns.index, y=avg_monthly_returns.values, palette='viridis', ax=ax)
+    ax.set_title(f'Avg Monthly Returns {Name}')
+    ax.set_ylabel('Average Return (%)')
+    ax.set_xlabel('Month')
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+
+# (key, section title, plot function, figure size) for every chart drawn per scheme
+CHARTS = [
+    ('heatmap', 'Seasonality Heatmap', seasonality1, (12, 6)),
+    ('barplot', 'Average Monthly Returns', seasonality2, (10, 5)),
+]
+
+# Draws one chart and returns it as PNG bytes (for the page) and single-page PDF bytes (for export)
+def render_chart(plot_func, monthly_returns_df, Name, figsize):
+    fig, ax = plt.subplots(figsize=figsize)
+    try:
+        plot_func(monthly_returns_df, Name, ax=ax)
+        png_buffer = io.BytesIO()
+        fig.savefig(png_buffer, format='png', bbox_inches='tight')
+        pdf_buffer = io.BytesIO()
+        fig.savefig(pdf_buffer, format='pdf')
+        return png_buffer.getvalue(), pdf_buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+# Renders every chart of one scheme; failures are reported per chart instead of raised
+def render_scheme(monthly_returns_df, Name):
+    charts = {}
+    for key, _, plot_func, figsize in CHARTS:
+        try:
+            png, pdf = render_chart(plot_func, monthly_returns_df, Name, figsize)
+            charts[key] = {'png': png, 'pdf': pdf, 'error': None}
+        except Exception as e:
+            charts[key] = {'png': None, 'pdf': None, 'error': str(e)}
+    return charts
+
+def merge_pdf_pages(pages):
+    writer = PdfWriter()
+    for page in pages:
+        writer.append(PdfReader(io.BytesIO(page)))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
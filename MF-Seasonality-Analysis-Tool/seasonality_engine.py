@@ -0,0 +1,58 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Vectorized seasonality engine: monthly returns for N schemes are laid out as one dense
+# (scheme x year x month) array, and per-month statistics for every scheme come out of a
+# single pass of NumPy reductions over the year axis. Missing months are NaN.
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Month-end percentage returns for a {scheme_code: NAV series} mapping, one column per scheme.
+# Matches fetch_data(): a month without a NAV carries the previous month-end NAV forward.
+def nav_to_monthly_returns(nav_series):
+    wide = pd.concat(nav_series, axis=1)
+    monthly_nav = wide.resample('M').last()
+    returns = monthly_nav.ffill().pct_change(fill_method=None) * 100
+    valid = monthly_nav.notna()
+    inside = valid.cummax() & valid[::-1].cummax()[::-1]
+    return returns.where(inside)
+
+# Wide monthly returns (month-end index x schemes) -> (codes, years, tensor of shape N x Y x 12)
+def monthly_returns_tensor(monthly_returns):
+    monthly_returns = monthly_returns.dropna(how='all')
+    codes = list(monthly_returns.columns)
+    if monthly_returns.empty:
+        return codes, np.array([], dtype=int), np.full((len(codes), 0, 12), np.nan)
+    index = pd.DatetimeIndex(monthly_returns.index)
+    first_year = index.year.min()
+    years = np.arange(first_year, index.year.max() + 1)
+    tensor = np.full((len(codes), len(years), 12), np.nan)
+    tensor[:, index.year - first_year, index.month - 1] = monthly_returns.to_numpy(dtype=float).T
+    return codes, years, tensor
+
+def tensor_from_nav(nav_series):
+    return monthly_returns_tensor(nav_to_monthly_returns(nav_series))
+
+# Single-scheme tensor straight from a fetch_data() frame ('date', 'Monthly Return')
+def tensor_from_returns_frame(monthly_returns_df, value_col='Monthly Return'):
+    series = monthly_returns_df.set_index('date')[value_col]
+    return monthly_returns_tensor(series.to_frame())
+
+# Per-month statistics over the year axis; every value is an (N x 12) array
+def monthly_stats(tensor):
+    valid = ~np.isnan(tensor)
+    count = valid.sum(axis=1)
+    total = np.where(valid, tensor, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.where(count > 0, total / count, np.nan)
+        median = np.nanmedian(tensor, axis=1) if tensor.shape[1] else np.full(count.shape, np.nan)
+        hit_rate = np.where(count > 0, (tensor > 0).sum(axis=1) / count, np.nan)
+    return {
+        'mean': mean,
+        'median': median,
+        'hit_rate': hit_rate,
+        'neg_count': (tensor < 0).sum(axis=1),
+        'count': count,
+    }
@@ -1,10 +1,24 @@
+import argparse
+import os
 import warnings
 from pandas.errors import SettingWithCopyWarning
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import pandas as pd
-from Fund_Analysis import Fund_Analysis
+from partition import partition_funds
+from dataset import read_table, is_dataset
+from nav_layout import compact_frame, split_nav_frame, memory_report, format_memory_report
+from fund_pool import run_fund_pool, is_error, DEFAULT_CHUNK_SIZE
+from rolling_metrics import iter_rolling_metrics, rolling_path, ROLLING_WINDOWS
+from benchmark_context import BenchmarkContext
+from multi_benchmark import load_benchmark_map, iter_benchmark_metrics, benchmarks_path
+from result_sink import open_sink, read_results, replace_results, DEFAULT_BATCH_ROWS
+from run_manifest import RunManifest, manifest_path, input_fingerprint
+from ranking import rank_results
+from out_of_core import FundBuckets, spill_path, describe
+from incremental import state_path, load_state, save_state, last_nav_dates, fund_anchors, plan_updates, \
+    stale_funds, merge_results
+import profiler
+from profiler import stage, profile_paths, PROFILE_SUFFIX, TRACE_SUFFIX
 # from fetch_benchmark_data import benchmark_data
 # from fetch_data import fetch_active_funds_nav_history
 
@@ -55,29 +69,263 @@ warnings.simplefilter(action='ignore', category=SettingWithCopyWarning)
 # print(df_final)
 
 
-# Load the data
-df = pd.read_csv(r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\final.csv')
-# Get unique funds
-Fund_list = df['Fund'].unique()
-benchmark_data = df[df['Fund'] == 'Nifty 50']
-# Function to process each fund
-def process_fund(Fund, benchmark_data, i):
-    final_data1, final_raw = Fund_Analysis(df[df['Fund'] == Fund], Fund, benchmark_data, 0.06, i)
-    return final_data1
-# Initialize final DataFrame
-df_final = pd.DataFrame()
-# Use ThreadPoolExecutor for parallel processing
-for i in ['default', 'Till_date']:
-    with ThreadPoolExecutor() as executor:
-        futures = {executor.submit(process_fund, Fund, benchmark_data, i): Fund for Fund in Fund_list}
-        
-        # Use tqdm to create a progress bar
-        with tqdm(total=len(futures), position=0, desc="Processing Funds") as pbar:
-            for future in as_completed(futures):
-                final_data1 = future.result()
-                df_final = pd.concat([df_final, final_data1])
-                pbar.update(1)  # Update the progress bar for each completed future
-# Reset index and save to CSV
-df_final = df_final.reset_index(drop=True)
-df_final.to_csv(r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\final_data.csv', index=False)
-print(df_final)
\ No newline at end of file
+DATA_DIR = r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data'
+RESULT_TYPES = ['default', 'Till_date']
+
+
+# Columns the analysis needs; a dataset input (see dataset.py) reads only these
+INPUT_COLUMNS = ['Fund', 'Date', 'Close', 'scheme_category', 'scheme_code', 'Category', 'fund_house']
+
+
+def load_funds(path):
+    # A CSV or a partitioned dataset directory; either way Date comes back parsed, and the
+    # repeated strings become categoricals (see nav_layout.py)
+    with stage('read_input'):
+        df = read_table(path, columns=INPUT_COLUMNS if is_dataset(path) else None)
+    with stage('compact_frame'):
+        df = compact_frame(df)
+    # Partition once: every fund becomes a contiguous (start, stop) block of rows
+    with stage('partition_funds'):
+        return partition_funds(df)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute risk/return metrics for every fund in final.csv.")
+    parser.add_argument('--input', default=os.path.join(DATA_DIR, 'final.csv'),
+                        help="final.csv or a dataset directory written by dataset.py")
+    parser.add_argument('--output', default=os.path.join(DATA_DIR, 'final_data.csv'),
+                        help="*.csv for a CSV file, any other path for a directory of Parquet parts")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help="metrics rows buffered before each write to the output")
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process',
+                        help="process pool with shared-memory NAVs (default) or the old thread pool")
+    parser.add_argument('--workers', type=int, default=None, help="worker count (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="funds per task")
+    parser.add_argument('--metrics', choices=['panel', 'loop'], default='panel',
+                        help="vectorized metrics across each chunk of funds (default) or per fund")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping funds its manifest lists as completed")
+    parser.add_argument('--incremental', action='store_true',
+                        help="recompute only funds with new NAVs and merge them into the existing output")
+    parser.add_argument('--rolling', choices=list(ROLLING_WINDOWS), default=None,
+                        help="write rolling-window time series for this window instead of point-in-time metrics")
+    parser.add_argument('--rolling-freq', choices=['daily', 'weekly', 'monthly'], default='daily')
+    parser.add_argument('--rolling-output', default=None,
+                        help="rolling table to write (default: <output>_rolling_<window>)")
+    parser.add_argument('--benchmark-map', default=None,
+                        help="JSON of scheme_category -> benchmark name(s), or 'default': write beta, alpha, "
+                             "R^2, Treynor and capture ratios against every assigned benchmark instead of "
+                             "point-in-time metrics")
+    parser.add_argument('--benchmark-output', default=None,
+                        help="per-benchmark table to write (default: <output>_benchmarks)")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="out-of-core: analyse the input in fund-aligned buckets sized to this budget "
+                             "instead of loading it whole (point-in-time metrics only)")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="print the memory footprint of the loaded NAV frame and its fact/scheme split")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"time every pipeline stage and write <output>{PROFILE_SUFFIX} and <output>{TRACE_SUFFIX}")
+    parser.add_argument('--benchmark', default='Nifty 50')
+    parser.add_argument('--risk-free-rate', type=float, default=0.06)
+    return parser.parse_args(argv)
+
+
+# Tables of another schema never go over the metrics output, or over any path that an
+# --incremental or --resume run tracks with a state or manifest file
+def side_output(args, path):
+    if os.path.abspath(path) == os.path.abspath(args.output) or \
+            os.path.exists(state_path(path)) or os.path.exists(manifest_path(path)):
+        raise SystemExit(f"{path} holds point-in-time metrics; choose another path")
+    return path
+
+
+def write_rolling(args, df, fund_slices):
+    path = side_output(args, args.rolling_output or rolling_path(args.output, args.rolling))
+    start, stop = fund_slices[args.benchmark]
+    market = BenchmarkContext.from_frame(df.iloc[start:stop])
+    with open_sink(path, args.batch_rows) as sink:
+        for Fund, frame in tqdm(iter_rolling_metrics(df, fund_slices, market, args.rolling, args.rolling_freq,
+                                                     args.risk_free_rate),
+                                total=len(fund_slices), position=0, desc="Rolling Metrics"):
+            sink.write(frame)
+    print(f"Wrote {sink.rows} rows to {path}")
+
+
+def write_benchmark_metrics(args, df, fund_slices):
+    path = side_output(args, args.benchmark_output or benchmarks_path(args.output))
+    benchmark_map = load_benchmark_map(args.benchmark_map)
+    missing = sorted({name for names in benchmark_map.values() for name in names} - set(fund_slices))
+    if missing:
+        print(f"Benchmarks not in {args.input}, skipped: {', '.join(missing)}")
+    with open_sink(path, args.batch_rows) as sink:
+        for Fund, frame in tqdm(iter_benchmark_metrics(df, fund_slices, benchmark_map, RESULT_TYPES, args.benchmark,
+                                                       args.risk_free_rate),
+                                total=len(fund_slices), position=0, desc="Benchmark Metrics"):
+            sink.write(frame)
+    print(f"Wrote {sink.rows} rows to {path}")
+
+
+# Peer percentiles and quartiles of the finished output, stored next to it (see ranking.py)
+def write_ranks(args):
+    with stage('rank_metrics'):
+        path = rank_results(args.output, args.batch_rows)
+    if path is not None:
+        print(f"Wrote category ranks to {path}")
+
+
+def run_parameters(args):
+    return {'benchmark': args.benchmark, 'risk_free_rate': args.risk_free_rate, 'result_types': RESULT_TYPES}
+
+
+def run_incremental(args, df, fund_slices):
+    path = state_path(args.output)
+    parameters = run_parameters(args)
+    state = load_state(path)
+    existing = read_results(args.output)
+    last_navs = last_nav_dates(df, fund_slices)
+    anchors = fund_anchors(last_navs, RESULT_TYPES)
+    if state is None or existing is None or state.get('parameters') != parameters:
+        # Nothing usable from a previous run: compute everything
+        existing = None
+        plan = {Fund: {rt: None for rt in RESULT_TYPES} for Fund in anchors}
+    else:
+        plan = plan_updates(anchors, state['anchors'], last_navs, state.get('last_navs', {}))
+    stale = stale_funds(existing, fund_slices)
+
+    frames = []
+    failed = {}
+    if plan or stale:
+        with tqdm(total=len(plan), position=0, desc="Updating Funds") as pbar:
+            for status, final_data1 in run_fund_pool(df, fund_slices, RESULT_TYPES, args.benchmark,
+                                                     args.risk_free_rate, args.workers, args.chunk_size,
+                                                     args.executor, args.metrics, plan):
+                if final_data1 is not None:
+                    frames.append(final_data1)
+                failed.update({Fund: reason for Fund, reason in status.items() if is_error(reason)})
+                pbar.update(len(status))
+        updates = pd.concat(frames, ignore_index=True) if frames else None
+        # Failed funds keep their old rows and old anchors, so the next run retries them; rows
+        # they produced for another result_type are dropped so no row is duplicated
+        if updates is not None and failed:
+            updates = updates[~updates['Fund'].isin(failed)]
+        with stage('merge_results'):
+            merged = merge_results(existing, updates, {Fund: jobs for Fund, jobs in plan.items() if Fund not in failed},
+                                   stale)
+        with stage('replace_results'):
+            rows = replace_results(args.output, merged, args.batch_rows)
+        print(f"Updated {len(plan) - len(failed)} funds ({0 if updates is None else len(updates)} rows); "
+              f"{rows} rows in {args.output}")
+        if stale:
+            print(f"Dropped {len(stale)} funds no longer in {args.input}: {', '.join(stale)}")
+        for Fund, reason in failed.items():
+            print(f"Failed: {Fund}: {reason}")
+        write_ranks(args)
+    else:
+        print(f"No new NAVs; {args.output} is up to date")
+    previous = state if existing is not None else {}
+    for Fund in failed:
+        if Fund in previous.get('anchors', {}):
+            anchors[Fund] = previous['anchors'][Fund]
+        else:
+            anchors.pop(Fund, None)
+        if Fund in previous.get('last_navs', {}):
+            last_navs[Fund] = previous['last_navs'][Fund]
+        else:
+            last_navs.pop(Fund, None)
+    save_state(path, {'parameters': parameters, 'anchors': anchors, 'last_navs': last_navs})
+
+
+def write_profile(args):
+    summary_path, trace_path = profile_paths(args.output)
+    active = profiler.disable()
+    active.write(summary_path, trace_path)
+    print(profiler.format_summary(active.summary()))
+    print(f"Wrote profile to {summary_path} and trace to {trace_path}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.profile:
+        return run(args)
+    profiler.enable()
+    try:
+        with stage('Final.py'):
+            return run(args)
+    finally:
+        write_profile(args)
+
+
+def run(args):
+    if args.memory_budget:
+        if args.rolling or args.benchmark_map or args.incremental:
+            raise SystemExit("--memory-budget only applies to the point-in-time metrics run")
+        buckets = FundBuckets(args.input, args.memory_budget, args.benchmark, spill_path(args.output),
+                              INPUT_COLUMNS if is_dataset(args.input) else None)
+        print(describe(buckets))
+        return run_analysis(args, buckets, buckets.funds)
+
+    df, fund_slices = load_funds(args.input)
+    if args.memory_report:
+        facts, schemes = split_nav_frame(df)
+        print(format_memory_report(memory_report({'nav frame': df, 'facts': facts, 'schemes': schemes})))
+    if args.rolling:
+        return write_rolling(args, df, fund_slices)
+    if args.benchmark_map:
+        return write_benchmark_metrics(args, df, fund_slices)
+    if args.incremental:
+        return run_incremental(args, df, fund_slices)
+    return run_analysis(args, [(df, fund_slices, list(fund_slices))], list(fund_slices))
+
+
+# parts yields (df, fund_slices, funds to analyse): the whole input once, or one fund-aligned
+# bucket at a time in out-of-core mode; all parts share one manifest, sink and state file
+def run_analysis(args, parts, funds):
+    with stage('input_fingerprint'):
+        fingerprint = input_fingerprint(args.input)
+    manifest, resumed = RunManifest.open(manifest_path(args.output), fingerprint, run_parameters(args), args.resume)
+    if resumed:
+        # Rows flushed after the last checkpoint belong to funds not yet marked completed; drop
+        # them so those funds are redone cleanly, then append the rest of the run
+        existing = read_results(args.output)
+        if existing is not None:
+            replace_results(args.output, existing[existing['Fund'].isin(manifest.completed)], args.batch_rows)
+        print(f"Resuming: {len(manifest.completed)} funds already done, "
+              f"{sum(Fund not in manifest.completed for Fund in funds)} to go")
+
+    # Results stream to disk as chunks finish instead of growing one frame with pd.concat;
+    # every flush checkpoints the funds whose rows it wrote
+    last_navs = {}
+    with open_sink(args.output, args.batch_rows, append=resumed) as sink, \
+            tqdm(total=sum(Fund not in manifest.completed for Fund in funds), position=0,
+                 desc="Processing Funds") as pbar:
+        sink.on_flush = manifest.commit
+        for df, fund_slices, part_funds in parts:
+            last_navs.update(last_nav_dates(df, {Fund: fund_slices[Fund] for Fund in part_funds}))
+            todo = [Fund for Fund in part_funds if Fund not in manifest.completed]
+            if not todo:
+                continue
+            # A plan limits the pool to this part's remaining funds; None runs every fund in df
+            plan = None if len(todo) == len(fund_slices) else {Fund: {rt: None for rt in RESULT_TYPES} for Fund in todo}
+            for status, final_data1 in run_fund_pool(df, fund_slices, RESULT_TYPES, args.benchmark,
+                                                     args.risk_free_rate, args.workers, args.chunk_size,
+                                                     args.executor, args.metrics, plan):
+                manifest.record(status)
+                with stage('sink_write'):
+                    sink.write(final_data1)
+                pbar.update(len(status))  # Update the progress bar for each completed chunk
+    manifest.finish()
+    print(f"Wrote {sink.rows} rows to {args.output}")
+    write_ranks(args)
+    errors = {Fund: reason for Fund, reason in manifest.failed.items() if is_error(reason)}
+    if manifest.failed:
+        print(f"{len(manifest.failed)} funds produced no rows ({len(errors)} errors); "
+              f"see {manifest.path}")
+    # Lets the next --incremental run start from this output
+    with stage('save_state'):
+        save_state(state_path(args.output), {'parameters': run_parameters(args),
+                                             'anchors': fund_anchors(last_navs, RESULT_TYPES),
+                                             'last_navs': last_navs})
+
+
+if __name__ == '__main__':
+    main()
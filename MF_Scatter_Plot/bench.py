@@ -0,0 +1,339 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+from synthetic_nav import synthetic_nav_frame, BENCHMARK
+from partition import partition_funds
+from nav_layout import compact_frame
+from benchmark_context import BenchmarkContext
+from window_engine import SeriesArrays, META_COLUMNS, iter_windows, window_frame
+from frequency import frequency
+from metrics import drawdown_summary, calculate_beta_alpha_r2, omega_ratio, downside_capture_ratio, upside_capture_ratio
+from calculate_risk_metrics import calculate_risk_metrics
+from Fund_Analysis import Fund_Analysis, analysis_end_date
+from panel_metrics import analyse_funds_panel
+from rolling_metrics import iter_rolling_metrics
+from fund_pool import run_fund_pool
+
+# Offline benchmark suite for the analytics hot paths, run on a seeded synthetic universe (see
+# synthetic_nav.py), so numbers are comparable between runs and machines need no data files:
+#   python bench.py                       # every scenario, 50 funds x 10 years
+#   python bench.py --funds 500 --scenario panel_metrics end_to_end_process
+#   python bench.py --save-baseline       # store the results as the baseline
+#   python bench.py                       # later: compare against it, exit 1 on a regression
+# Each scenario is timed --repeat times (the median is reported, as seconds and funds/sec) and
+# then run once more under tracemalloc for its peak Python/NumPy allocation. Worker processes
+# are not traced, so the process-pool scenario reports the parent's memory only.
+# A scenario regresses when it is slower than the baseline by more than --time-tolerance or
+# allocates more by more than --memory-tolerance; baselines only compare at the same size.
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+SEASONALITY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MF-Seasonality-Analysis-Tool')
+RESULT_TYPES = ['default', 'Till_date']
+# Per-function scenarios work on at most this many funds, so they stay quick at any size
+SAMPLE_FUNDS = 20
+# Differences below these are noise whatever the tolerance
+MIN_SECONDS = 0.005
+MIN_MB = 0.5
+
+
+class BenchData:
+    def __init__(self, n_funds, years, seed):
+        self.df, self.fund_slices = partition_funds(compact_frame(synthetic_nav_frame(n_funds, years, seed)))
+        start, stop = self.fund_slices[BENCHMARK]
+        self.market_frame = self.df.iloc[start:stop]
+        self.market = BenchmarkContext.from_frame(self.market_frame)
+        self.funds = [Fund for Fund in self.fund_slices if Fund != BENCHMARK]
+        self.sample = self.funds[:SAMPLE_FUNDS]
+
+    def fund_frame(self, Fund):
+        start, stop = self.fund_slices[Fund]
+        return self.df.iloc[start:stop]
+
+    def series(self, Fund):
+        return SeriesArrays.from_frame(self.fund_frame(Fund))
+
+    def meta(self, Fund):
+        row = self.fund_frame(Fund).iloc[0]
+        return {col: row.get(col) for col in META_COLUMNS}
+
+    # Every analysis window of the sample funds, as the frames calculate_risk_metrics receives
+    def windows(self):
+        windows = []
+        for Fund in self.sample:
+            fund = self.series(Fund)
+            max_date = analysis_end_date(pd.Timestamp(fund.dates[-1]), 'default')
+            for timeline, freq, *arrays in iter_windows(fund, self.market, max_date):
+                windows.append((window_frame(self.meta(Fund), *arrays), timeline, freq))
+        return windows
+
+    # Daily (returns, market returns) of the sample funds on the benchmark's dates, as Series
+    def daily_returns(self):
+        market = self.market_frame.set_index('Date')['Close']
+        pairs = []
+        for Fund in self.sample:
+            nav = self.fund_frame(Fund).set_index('Date')['Close']
+            joined = pd.concat([nav, market], axis=1, join='inner').pct_change().dropna()
+            pairs.append((nav, joined.iloc[:, 0], joined.iloc[:, 1]))
+        return pairs
+
+
+# Each scenario takes the BenchData and returns (callable to time, funds it processes); the
+# setup work before the callable is not timed
+def bench_frequency(data):
+    frames = [data.fund_frame(Fund)[['Date', 'Close']] for Fund in data.sample]
+    market = data.market_frame[['Date', 'Close']]
+    return lambda: [frequency(frame, market, freq) for frame in frames for freq in ('daily', 'weekly', 'monthly')], \
+        len(frames)
+
+
+def bench_calculate_risk_metrics(data):
+    windows = data.windows()
+    return lambda: [calculate_risk_metrics(frame, timeline, 0.06, freq) for frame, timeline, freq in windows], \
+        len(data.sample)
+
+
+def bench_drawdown(data):
+    navs = [nav for nav, _, _ in data.daily_returns()]
+    return lambda: [drawdown_summary(nav, 0.12) for nav in navs], len(navs)
+
+
+def bench_regression(data):
+    pairs = data.daily_returns()
+    return lambda: [calculate_beta_alpha_r2(returns, market, 252) for _, returns, market in pairs], len(pairs)
+
+
+def bench_ratios(data):
+    pairs = data.daily_returns()
+    return lambda: [(omega_ratio(returns), downside_capture_ratio(returns, market), upside_capture_ratio(returns, market))
+                    for _, returns, market in pairs], len(pairs)
+
+
+def bench_fund_analysis(data):
+    frames = [(Fund, data.fund_frame(Fund)) for Fund in data.sample]
+    return lambda: [Fund_Analysis(frame, Fund, data.market, 0.06, result_type)
+                    for Fund, frame in frames for result_type in RESULT_TYPES], len(frames)
+
+
+def bench_panel_metrics(data):
+    funds = [data.series(Fund) for Fund in data.funds]
+    metas = [data.meta(Fund) for Fund in data.funds]
+    return lambda: [analyse_funds_panel(funds, data.market, metas, 0.06, result_type)
+                    for result_type in RESULT_TYPES], len(funds)
+
+
+def bench_rolling_metrics(data):
+    slices = {Fund: data.fund_slices[Fund] for Fund in data.sample}
+    return lambda: list(iter_rolling_metrics(data.df, slices, data.market, '3Y', 'daily')), len(slices)
+
+
+def bench_seasonality(data):
+    if SEASONALITY_DIR not in sys.path:
+        sys.path.append(SEASONALITY_DIR)
+    from seasonality_engine import tensor_from_nav, monthly_stats
+
+    navs = {Fund: data.fund_frame(Fund).set_index('Date')['Close'] for Fund in data.funds}
+
+    def run():
+        _, _, tensor = tensor_from_nav(navs)
+        return monthly_stats(tensor)
+    return run, len(navs)
+
+
+def _pool_scenario(executor, metrics):
+    def bench(data):
+        def run():
+            for _ in run_fund_pool(data.df, data.fund_slices, RESULT_TYPES, BENCHMARK, 0.06,
+                                   executor=executor, metrics=metrics):
+                pass
+        return run, len(data.fund_slices)
+    return bench
+
+
+# Final.py from CSV in to CSV out, the way the daily job runs it
+def bench_final(data):
+    from Final import main
+
+    workdir = tempfile.mkdtemp(prefix='bench_final_')
+    source = os.path.join(workdir, 'final.csv')
+    data.df.to_csv(source, index=False)
+    output = os.path.join(workdir, 'final_data.csv')
+
+    def run():
+        main(['--input', source, '--output', output, '--executor', 'thread'])
+    run.cleanup = lambda: shutil.rmtree(workdir, ignore_errors=True)
+    return run, len(data.fund_slices)
+
+
+SCENARIOS = {
+    'frequency': ('function', bench_frequency),
+    'calculate_risk_metrics': ('function', bench_calculate_risk_metrics),
+    'drawdown_summary': ('function', bench_drawdown),
+    'beta_alpha_r2': ('function', bench_regression),
+    'omega_capture_ratios': ('function', bench_ratios),
+    'Fund_Analysis': ('function', bench_fund_analysis),
+    'panel_metrics': ('function', bench_panel_metrics),
+    'rolling_metrics': ('function', bench_rolling_metrics),
+    'seasonality': ('function', bench_seasonality),
+    'end_to_end_loop': ('end_to_end', _pool_scenario('thread', 'loop')),
+    'end_to_end_panel': ('end_to_end', _pool_scenario('thread', 'panel')),
+    'end_to_end_process': ('end_to_end', _pool_scenario('process', 'panel')),
+    'final_cli': ('end_to_end', bench_final),
+}
+
+
+def run_scenario(data, name, repeat=3, memory=True):
+    kind, setup = SCENARIOS[name]
+    run, funds = setup(data)
+    try:
+        run()  # warm-up: imports, caches, pool start-up paths
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start)
+        peak_mb = None
+        if memory:
+            tracemalloc.start()
+            try:
+                run()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            finally:
+                tracemalloc.stop()
+    finally:
+        getattr(run, 'cleanup', lambda: None)()
+    median = float(np.median(seconds))
+    return {
+        'kind': kind,
+        'funds': funds,
+        'seconds': median,
+        'min_seconds': min(seconds),
+        'funds_per_sec': funds / median if median > 0 else None,
+        'peak_mb': peak_mb,
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+# Scenario -> list of regression messages, comparing results with a stored baseline
+def compare(results, baseline, time_tolerance=0.25, memory_tolerance=0.10):
+    regressions = {}
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        problems = []
+        if result['seconds'] - base['seconds'] > max(MIN_SECONDS, base['seconds'] * time_tolerance):
+            problems.append(f"time {base['seconds']:.4f}s -> {result['seconds']:.4f}s "
+                            f"({result['seconds'] / base['seconds'] - 1:+.0%})")
+        if result['peak_mb'] is not None and base.get('peak_mb') is not None and \
+                result['peak_mb'] - base['peak_mb'] > max(MIN_MB, base['peak_mb'] * memory_tolerance):
+            problems.append(f"peak memory {base['peak_mb']:.1f} MB -> {result['peak_mb']:.1f} MB")
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def format_results(results, baseline=None):
+    rows = []
+    for name, result in results.items():
+        base = (baseline or {}).get('results', {}).get(name)
+        rows.append({
+            'scenario': name,
+            'kind': result['kind'],
+            'funds': result['funds'],
+            'seconds': result['seconds'],
+            'funds/sec': result['funds_per_sec'],
+            'peak MB': np.nan if result['peak_mb'] is None else result['peak_mb'],
+            'vs baseline': f"{result['seconds'] / base['seconds'] - 1:+.0%}" if base else '',
+        })
+    return pd.DataFrame(rows).to_string(index=False, na_rep='', formatters={
+        'seconds': '{:.4f}'.format, 'funds/sec': '{:,.1f}'.format,
+        'peak MB': '{:,.1f}'.format})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fund analytics on synthetic data.")
+    parser.add_argument('--funds', type=int, default=50)
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', nargs='*', choices=list(SCENARIOS), default=None,
+                        help="scenarios to run (default: all)")
+    parser.add_argument('--kind', choices=['function', 'end_to_end'], default=None,
+                        help="run only per-function or only end-to-end scenarios")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per scenario")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run")
+    parser.add_argument('--output', default=None, help="write the results as JSON here")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.10)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    warnings.filterwarnings('ignore')
+    args = parse_args(argv)
+    names = [name for name in (args.scenario or SCENARIOS) if args.kind in (None, SCENARIOS[name][0])]
+    config = {'funds': args.funds, 'years': args.years, 'seed': args.seed}
+
+    data = BenchData(args.funds, args.years, args.seed)
+    results = {}
+    for name in names:
+        print(f"Running {name} ...", flush=True)
+        results[name] = run_scenario(data, name, args.repeat, not args.no_memory)
+
+    report = {'config': config, 'environment': environment(),
+              'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print(f"Baseline {args.baseline} was recorded for {baseline.get('config')}; not comparing")
+            baseline = None
+    print(format_results(results, baseline))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Keep scenarios that were not re-run this time
+            with open(args.baseline) as f:
+                previous = json.load(f)
+            if previous.get('config') == config:
+                report['results'] = {**previous['results'], **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+        for name, problems in regressions.items():
+            print(f"REGRESSION {name}: {'; '.join(problems)}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import threading
+import numpy as np
+from window_engine import SeriesArrays, FREQUENCIES, simple_returns
+
+# Benchmark data prepared once per run and shared read-only by every fund analysis.
+# It holds the benchmark parsed and sorted, resampled at daily/weekly/monthly with returns,
+# and a cache of per-window (labels, returns) keyed by (frequency, row bounds). A window is a
+# slice of the full resample: only its last bin, which the window end may cut, gets its return
+# recomputed. Funds that share an analysis end date ask for the same windows, so after the
+# first fund each benchmark window is a dict lookup. The benchmark DataFrame is never modified.
+
+class BenchmarkContext:
+    def __init__(self, dates, close):
+        self.series = SeriesArrays(dates, close)
+        self.resampled = {}
+        for freq in FREQUENCIES:
+            if len(self.series):
+                labels, closes = self.series.resampled(freq, 0, len(self.series))
+            else:
+                labels, closes = self.series.dates, self.series.close
+            self.resampled[freq] = (labels, closes, simple_returns(closes) if len(closes) else closes)
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, date_col='Date', value_col='Close'):
+        return cls(df[date_col], df[value_col])
+
+    def __len__(self):
+        return len(self.series)
+
+    # (labels, returns) of the benchmark resampled inside [start, end]; the first return is NaN,
+    # exactly as if the benchmark had been filtered to the window before resampling
+    def window(self, freq, start=None, end=None):
+        bounds = self.series.bounds(start, end)
+        key = (freq,) + bounds
+        cached = self._windows.get(key)
+        if cached is not None or key in self._windows:
+            return cached
+        lo, hi = bounds
+        if hi <= lo:
+            result = None
+        else:
+            result = self._slice(freq, lo, hi)
+        with self._lock:
+            self._windows[key] = result
+        return result
+
+    # The bins of rows [lo, hi) are bins i..j of the full resample, the last one ending at row
+    # hi - 1 instead of its full-series close
+    def _slice(self, freq, lo, hi):
+        labels, closes, returns = self.resampled[freq]
+        ends = self.series.bin_ends[freq]
+        i = np.searchsorted(ends, lo, 'left')
+        j = np.searchsorted(ends, hi - 1, 'left')
+        window_returns = returns[i:j + 1].copy()
+        window_returns[0] = np.nan
+        if j > i:
+            window_returns[-1] = self.series.close[hi - 1] / closes[j - 1] - 1
+        return labels[i:j + 1], window_returns
+
+
+def as_benchmark_context(benchmark):
+    if isinstance(benchmark, BenchmarkContext):
+        return benchmark
+    return BenchmarkContext.from_frame(benchmark)
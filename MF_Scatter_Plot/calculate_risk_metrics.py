@@ -1,5 +1,6 @@
-from metrics import max_drawdown, recovery_time, calculate_beta_alpha_r2, omega_ratio, calmar_ratio, downside_capture_ratio, upside_capture_ratio
+from metrics import drawdown_summary, calculate_beta_alpha_r2, omega_ratio, calmar_ratio, downside_capture_ratio, upside_capture_ratio
 import numpy as np
+from profiler import stage
 
 def calculate_risk_metrics(df_final, timeline, risk_free_rate=0.06, freq='monthly', result_type='default'):
     if df_final is None or df_final.empty:
@@ -14,8 +15,11 @@ def calculate_risk_metrics(df_final, timeline, risk_free_rate=0.06, freq='monthl
     cagr = ((last / first) ** (1 / years)) - 1
     cagr = cagr * 100
 
-    max_dd, peak_date, trough_date = max_drawdown(df_final.set_index('Date')['Close'].dropna())
-    recovery_time_value, recovery_date = recovery_time(df_final.set_index('Date')['Close'].dropna())
+    # One drawdown pass gives the max drawdown, its dates and the recovery together
+    with stage('drawdown'):
+        drawdown = drawdown_summary(df_final.set_index('Date')['Close'])
+    max_dd, peak_date, trough_date = drawdown['max_drawdown'], drawdown['peak_date'], drawdown['trough_date']
+    recovery_time_value, recovery_date = drawdown['recovery_time'], drawdown['recovery_date']
 
     df_final = df_final.dropna(subset=['Fund', 'Return'])
     if df_final.empty:
@@ -36,7 +40,8 @@ def calculate_risk_metrics(df_final, timeline, risk_free_rate=0.06, freq='monthl
         sharpe_ratio = np.mean(excess_returns) * annual_rate / (np.std(excess_returns) * np.sqrt(annual_rate) if np.std(excess_returns) != 0 else np.nan)
         downside_returns = returns[returns < returns.mean()].std() * np.sqrt(12)
         sortino_ratio = np.mean(excess_returns) * annual_rate / (downside_returns if downside_returns != 0 else np.nan)
-        beta_value, alpha, r_squared = calculate_beta_alpha_r2(returns, market_returns, annual_rate)
+        with stage('linregress'):
+            beta_value, alpha, r_squared = calculate_beta_alpha_r2(returns, market_returns, annual_rate)
         treynor_ratio = np.mean(excess_returns) * annual_rate / (beta_value if beta_value != 0 else np.nan)
         omega = omega_ratio(returns)
         calmar = calmar_ratio(returns, df_final['Close'], freq)
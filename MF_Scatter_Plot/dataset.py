@@ -0,0 +1,179 @@
+import os
+import json
+import shutil
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+# Columnar dataset layer for the pipeline's tables (final.csv, active_funds_nav_history.csv,
+# final_data.csv). A table is stored as a directory of Parquet or Arrow IPC files, hive-partitioned
+# by a category or fund-house column (e.g. scheme_category=Equity Scheme - Large Cap Fund/...):
+#   - dates are stored typed, string columns with few distinct values dictionary-encoded, so a
+#     load parses nothing and the strings come back as pandas categoricals;
+#   - read_dataset(columns=...) reads only the requested columns;
+#   - read_dataset(filters=...) prunes whole partitions from the directory names and skips
+#     Parquet row groups from their statistics before anything is decoded;
+#   - files are opened memory-mapped, so Arrow IPC reads are close to zero-copy.
+# A small _dataset.json keeps the format, partition columns and original column order.
+# Directories without it (e.g. the Parquet parts written by result_sink) are read as plain Parquet.
+
+METADATA_FILE = '_dataset.json'
+FORMATS = {'parquet': 'parquet', 'arrow': 'ipc'}
+DATE_COLUMNS = ['Date', 'Peak_Date', 'Trough_Date', 'Recovery_Date']
+# Strings repeated on at least this share of rows are dictionary-encoded
+DICTIONARY_RATIO = 0.5
+
+PARTITIONS = {
+    'nav': ['scheme_category'],
+    'metrics': ['result_type', 'Category_Name'],
+}
+
+
+def _encode(df, partition_cols):
+    df = df.copy()
+    for col in df.columns:
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif col in partition_cols:
+            # Partition values live in the directory names; keep them plain strings
+            df[col] = df[col].astype('string')
+        elif df[col].dtype == object:
+            values = df[col].dropna()
+            if len(values) and values.map(type).eq(str).all() and values.nunique() <= DICTIONARY_RATIO * len(values):
+                df[col] = df[col].astype('category')
+    return df
+
+
+def write_dataset(df, path, partition_cols=None, fmt='parquet'):
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {list(FORMATS)}")
+    partition_cols = [col for col in (partition_cols or []) if col in df.columns]
+    table = pa.Table.from_pandas(_encode(df, partition_cols), preserve_index=False)
+
+    # Write beside the target and swap it in, so readers never see a half-written dataset
+    tmp_path = path.rstrip('/\\') + '.tmp'
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    # Single-threaded write: keeps row order, and Arrow's writer threads otherwise occasionally
+    # abort the interpreter at exit in processes that have already run a Final.py pool
+    ds.write_dataset(table, tmp_path, format=FORMATS[fmt],
+                     partitioning=partition_cols or None, partitioning_flavor='hive' if partition_cols else None,
+                     existing_data_behavior='overwrite_or_ignore', use_threads=False)
+    with open(os.path.join(tmp_path, METADATA_FILE), 'w') as f:
+        json.dump({'format': fmt, 'partition_cols': partition_cols, 'columns': list(df.columns)}, f, indent=1)
+    old_path = path.rstrip('/\\') + '.old'
+    if os.path.isdir(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def dataset_metadata(path):
+    meta_path = os.path.join(path, METADATA_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f)
+    return {'format': 'parquet', 'partition_cols': [], 'columns': None}
+
+
+def is_dataset(path):
+    return os.path.isdir(path)
+
+
+_OPERATORS = {
+    '==': lambda field, value: field == value,
+    '!=': lambda field, value: field != value,
+    '<': lambda field, value: field < value,
+    '<=': lambda field, value: field <= value,
+    '>': lambda field, value: field > value,
+    '>=': lambda field, value: field >= value,
+    'in': lambda field, value: field.isin(list(value)),
+    'not in': lambda field, value: ~field.isin(list(value)),
+}
+
+
+# [(column, op, value), ...] ANDed together, as in pd.read_parquet(filters=...). The operators
+# work on both Arrow fields and pandas Series, so CSV input is filtered the same way.
+def filter_expression(filters):
+    expression = None
+    for col, op, value in filters or []:
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        term = _OPERATORS[op](ds.field(col), value)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def open_dataset(path):
+    meta = dataset_metadata(path)
+    # Partition keys are read as strings (Arrow cannot unify dictionaries holding the null key)
+    partitioning = ds.HivePartitioning.discover() if meta['partition_cols'] else None
+    dataset = ds.dataset(path, format=FORMATS[meta['format']], partitioning=partitioning,
+                         filesystem=pafs.LocalFileSystem(use_mmap=True),
+                         exclude_invalid_files=False, ignore_prefixes=['_', '.'])
+    return dataset, meta
+
+
+# Loads a dataset into pandas, reading only the given columns and the rows matching filters.
+# categories=False returns plain strings instead of categoricals.
+def read_dataset(path, columns=None, filters=None, categories=True):
+    dataset, meta = open_dataset(path)
+    available = dataset.schema.names
+    if columns is None:
+        columns = meta['columns'] or available
+    columns = [col for col in columns if col in available]
+    table = dataset.to_table(columns=list(columns), filter=filter_expression(filters))
+    if not categories:
+        table = table.cast(pa.schema([
+            pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+            for field in table.schema
+        ]))
+    df = table.to_pandas()
+    for col in meta['partition_cols']:
+        if col in df.columns and categories:
+            df[col] = df[col].astype('category')
+    return df
+
+
+# CSV or dataset path -> DataFrame, so every stage can take either
+def read_table(path, columns=None, filters=None, categories=True):
+    if is_dataset(path):
+        return read_dataset(path, columns, filters, categories)
+    df = pd.read_csv(path, usecols=None if columns is None else (lambda col: col in columns))
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    if filters:
+        mask = pd.Series(True, index=df.index)
+        for col, op, value in filters:
+            mask &= _OPERATORS[op](df[col], value)
+        df = df[mask.to_numpy()].reset_index(drop=True)
+    return df
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a CSV (or dataset) into a partitioned columnar dataset.")
+    parser.add_argument('source', help="CSV file or dataset directory")
+    parser.add_argument('dest', help="dataset directory to write")
+    parser.add_argument('--kind', choices=list(PARTITIONS), default=None,
+                        help="use the standard partitioning for NAV history or the metrics table")
+    parser.add_argument('--partition-by', nargs='*', default=None, help="partition columns")
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    df = read_table(args.source)
+    partition_cols = args.partition_by if args.partition_by is not None else PARTITIONS.get(args.kind, [])
+    write_dataset(df, args.dest, partition_cols, args.format)
+    print(f"Wrote {len(df)} rows to {args.dest} partitioned by {partition_cols or 'nothing'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,106 +1,36 @@
-import requests
-import pandas as pd
-from tqdm import tqdm
+import os
+import asyncio
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
-import time
-from mftool import Mftool
-
-# --- Step 1: Fetch and filter scheme master ---
-url = "https://api.mfapi.in/mf"
-response = requests.get(url)
-response.raise_for_status()
-data = response.json()
-df = pd.DataFrame(data)
-
-scheme_codes = df['schemeCode'].tolist()
+from dataset import write_dataset
+from nav_layout import memory_report, format_memory_report
+from mfapi_client import ingest, combine_histories, format_stats
+
+# --- Steps 1-3: scheme master, active check (/latest) and NAV history of the active funds ---
+# One asyncio run over pooled keep-alive connections, with bounded concurrency, per-host rate
+# limiting and jittered backoff (see mfapi_client.py); set MFAPI_URL to use a local mfapi_stub.py.
+# Each scheme's NAVs become a small fact frame (schemeCode int32, date, nav float64); the scheme
+# metadata is no longer copied onto every daily entry but kept once per scheme (see nav_layout.py)
 today = datetime.today().date()
 threshold_date = today - timedelta(days=5)
-
-def check_active(i, retries=3):
-    url = f"https://api.mfapi.in/mf/{i}/latest"
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            if data.get('data') and pd.to_datetime(data['data'][0]['date'], dayfirst=True).date() >= threshold_date:
-                return i
-        except Exception as e:
-            if attempt == retries - 1:
-                print(f"Failed for {i} after {retries} attempts: {e}")
-            time.sleep(1)
-    return None
-
-# --- Step 2: Check for active funds in parallel (low concurrency) ---
-active_list = []
-inactive_list = []
-with ThreadPoolExecutor(max_workers=6) as executor:
-    results = list(tqdm(executor.map(check_active, scheme_codes), total=len(scheme_codes), desc="Checking active status"))
-for i, code in enumerate(scheme_codes):
-    if results[i]:
-        active_list.append(results[i])
-    else:
-        inactive_list.append(code)
-
-print(f"Active schemes found: {len(active_list)}")
-
-# --- Step 3: Fetch NAV history for only active funds, in parallel (low concurrency) ---
-def fetch_nav(i, retries=3):
-    url = f"https://api.mfapi.in/mf/{i}"
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            nav_data = data.get('data', [])
-            scheme_meta = df[df['schemeCode'] == i].iloc[0].to_dict()
-            for entry in nav_data:
-                for k, v in scheme_meta.items():
-                    entry[k] = v
-            return nav_data
-        except Exception as e:
-            if attempt == retries - 1:
-                print(f"Failed to fetch NAV for {i} after {retries} attempts: {e}")
-            time.sleep(1)
-    return []
-
-all_nav_data = []
-with ThreadPoolExecutor(max_workers=6) as executor:
-    nav_results = list(tqdm(executor.map(fetch_nav, active_list), total=len(active_list), desc="Fetching NAV history"))
-    for nav_data in nav_results:
-        all_nav_data.extend(nav_data)
-
-# --- Step 4: Save to DataFrame and CSV ---
-all_nav_df = pd.DataFrame(all_nav_data)
-if not all_nav_df.empty and 'date' in all_nav_df.columns:
-    all_nav_df['date'] = pd.to_datetime(all_nav_df['date'], format='%d-%m-%Y', errors='coerce')
-
-
-mf = Mftool()
-
-# Ensure columns exist
-for col in ['fund_house', 'scheme_type', 'scheme_category', 'scheme_start_date', 'scheme_start_nav']:
-    if col not in all_nav_df.columns:
-        all_nav_df[col] = None
-
-def fetch_and_update(i):
-    try:
-        details = mf.get_scheme_details(i)
-        mask = all_nav_df['schemeCode'] == i
-        all_nav_df.loc[mask, 'fund_house'] = details.get('fund_house')
-        all_nav_df.loc[mask, 'scheme_type'] = details.get('scheme_type')
-        all_nav_df.loc[mask, 'scheme_category'] = details.get('scheme_category')
-        start_date = details.get('scheme_start_date', {}).get('date')
-        start_nav = details.get('scheme_start_date', {}).get('nav')
-        all_nav_df.loc[mask, 'scheme_start_date'] = start_date
-        all_nav_df.loc[mask, 'scheme_start_nav'] = start_nav
-    except Exception as e:
-        print(f"Failed for {i}: {e}")
-
-unique_codes = all_nav_df['schemeCode'].unique()
-with ThreadPoolExecutor(max_workers=8) as executor:
-    list(tqdm(executor.map(fetch_and_update, unique_codes), total=len(unique_codes), desc="Fetching scheme details"))
-
-
-all_nav_df.to_csv(r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\API_active_funds_nav_history.csv', index=False)
\ No newline at end of file
+df, active_list, histories, stats = asyncio.run(ingest(threshold_date))
+print(format_stats(stats))
+
+# --- Step 4: Fact table and scheme dimension table ---
+# The scheme details (fund house, type, category, first NAV) come from the meta block of the
+# same history responses, which is what mftool's get_scheme_details fetched them from again
+nav_facts, details = combine_histories(histories)
+schemes = df[df['schemeCode'].isin(nav_facts['schemeCode'].unique())].drop_duplicates('schemeCode')
+schemes = schemes.astype({'schemeCode': 'int32'}).set_index('schemeCode')
+schemes = schemes.join(details.astype({'schemeCode': 'int32'}).set_index('schemeCode'))
+schemes = schemes.astype({col: 'category' for col in ['fund_house', 'scheme_type', 'scheme_category']})
+
+print(format_memory_report(memory_report({'nav facts': nav_facts, 'schemes': schemes})))
+
+data_dir = r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data'
+write_dataset(nav_facts, os.path.join(data_dir, 'API_nav_facts'))
+write_dataset(schemes.reset_index(), os.path.join(data_dir, 'API_schemes'))
+
+# Same wide CSV as before for the existing consumers: metadata joined back per row at write time
+all_nav_df = nav_facts.join(schemes, on='schemeCode')
+all_nav_df = all_nav_df[['date', 'nav'] + [col for col in all_nav_df.columns if col not in ('date', 'nav')]]
+all_nav_df.to_csv(os.path.join(data_dir, 'API_active_funds_nav_history.csv'), index=False)
\ No newline at end of file
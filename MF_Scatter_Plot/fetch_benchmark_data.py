@@ -1,4 +1,17 @@
-def benchmark_data():
+# NSE index name and scheme_code of every benchmark series the pipeline knows about, keyed by
+# the Fund name its rows get (the names multi_benchmark.DEFAULT_BENCHMARK_MAP refers to)
+BENCHMARK_INDICES = {
+    'Nifty 50': ('NIFTY 50', 100000),
+    'Nifty 100': ('NIFTY 100', 100001),
+    'Nifty 500': ('NIFTY 500', 100002),
+    'Nifty Midcap 150': ('NIFTY MIDCAP 150', 100003),
+    'Nifty Smallcap 250': ('NIFTY SMALLCAP 250', 100004),
+    'Nifty LargeMidcap 250': ('NIFTY LARGEMIDCAP 250', 100005),
+    'Nifty 500 Multicap 50:25:25': ('NIFTY500 MULTICAP 50:25:25', 100006),
+}
+
+
+def benchmark_data(indices=('Nifty 50',)):
     import pandas as pd
     import numpy as np
     from datetime import datetime
@@ -10,22 +23,27 @@ def benchmark_data():
     # nifty_50 = yf.download(symbol, start="1992-01-01", end="2025-02-02")
     today=datetime.today()
 
-    nifty_data = index_history("NIFTY 50", "01-01-1992", today.strftime("%m-%d-%Y"))
-    nifty_data['HistoricalDate']=pd.to_datetime(nifty_data['HistoricalDate'])
+    # One block of rows per index, each with its own Fund name and scheme_code
+    frames=[]
+    for name in indices:
+        index_name, scheme_code = BENCHMARK_INDICES[name]
+        nifty_data = index_history(index_name, "01-01-1992", today.strftime("%m-%d-%Y"))
+        nifty_data['HistoricalDate']=pd.to_datetime(nifty_data['HistoricalDate'])
 
-    nifty_data=nifty_data.reset_index()
-    nifty_data['Date']=pd.to_datetime(nifty_data['HistoricalDate'].apply(lambda x:x.strftime("%d-%m-%Y")))
-    nifty_data['scheme_category']='Benchmark Nifty 50'
-    nifty_data['Fund']='Nifty 50'
-    nifty_data['scheme_code']=100000
-    nifty_data['scheme_type']='Benchmark'
-    nifty_data['Category']='Benchmark'
-    nifty_data['Sub_category']='Benchmark'
-    nifty_data['Close']=nifty_data['CLOSE']
-    nifty_df=nifty_data[['scheme_code','Fund','Date','Close','Category','Sub_category','scheme_category','scheme_type']]
+        nifty_data=nifty_data.reset_index()
+        nifty_data['Date']=pd.to_datetime(nifty_data['HistoricalDate'].apply(lambda x:x.strftime("%d-%m-%Y")))
+        nifty_data['scheme_category']='Benchmark '+name
+        nifty_data['Fund']=name
+        nifty_data['scheme_code']=scheme_code
+        nifty_data['scheme_type']='Benchmark'
+        nifty_data['Category']='Benchmark'
+        nifty_data['Sub_category']='Benchmark'
+        nifty_data['Close']=nifty_data['CLOSE']
+        frames.append(nifty_data[['scheme_code','Fund','Date','Close','Category','Sub_category','scheme_category','scheme_type']])
+        print(f"Successfully fetched {name} data")
+    nifty_df=pd.concat(frames, ignore_index=True)
 
-    # Save all NAV data to a single CSV 
-    print("Successfully fetched Nifty 50 data")
+    # Save all NAV data to a single CSV
     # output_filename = r"C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\benchmark_data.csv"
     # nifty_df.to_csv(output_filename, index=False)
-    return nifty_df
\ No newline at end of file
+    return nifty_df
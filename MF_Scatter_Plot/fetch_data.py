@@ -3,6 +3,7 @@ from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
+from dataset import write_dataset, PARTITIONS
 
 mf = Mftool()
 scheme_codes = list(mf.get_scheme_codes().keys())[1:]
@@ -92,4 +93,6 @@ print(f"Combined NAV DataFrame shape: {combined_nav_df.shape}")
 df_fetched = combined_nav_df.merge(final_df, on='scheme_code', how='inner')
 df_fetched['date'] = pd.to_datetime(df_fetched['date'], dayfirst=True, errors='coerce')
 df_fetched = df_fetched.rename(columns={'date': 'Date', 'nav': 'Close', 'scheme_name': 'Fund'})
-df_fetched.to_csv(r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\active_funds_nav_history.csv', index=False)
\ No newline at end of file
+df_fetched.to_csv(r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\active_funds_nav_history.csv', index=False)
+# Columnar copy partitioned by category (see dataset.py): typed dates and dictionary-encoded strings
+write_dataset(df_fetched, r'C:\Users\hanis\source\repos\streamlit\streamlit\MF_Scatter_Plot\data\active_funds_nav_history', PARTITIONS['nav'])
\ No newline at end of file
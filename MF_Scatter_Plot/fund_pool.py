@@ -0,0 +1,202 @@
+import os
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from Fund_Analysis import analyse_fund
+from panel_metrics import analyse_funds_panel
+from window_engine import SeriesArrays, META_COLUMNS
+from benchmark_context import BenchmarkContext
+import profiler
+
+# Process-pool execution of the fund universe. The Date and Close columns of the partitioned
+# frame (see partition.py) are copied into shared memory once; workers attach to them in their
+# initializer, build the BenchmarkContext once per process, and then receive only small chunks
+# of (Fund, start, stop, meta) tuples. No NAV data is pickled per task.
+# When profiling (see profiler.py), workers profile themselves and return their records with
+# each chunk; the driver merges them into its own profile.
+
+DEFAULT_CHUNK_SIZE = 25
+# Reasons a fund produces no rows without anything having gone wrong
+NO_HISTORY = "insufficient history"
+NO_WINDOWS = "no analysis window with enough data"
+
+
+class SharedNavArrays:
+    def __init__(self, dates, close):
+        self._blocks = []
+        self.spec = {}
+        for name, array in (('dates', dates.view('int64')), ('close', close)):
+            array = np.ascontiguousarray(array)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            self._blocks.append(shm)
+            self.spec[name] = (shm.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+
+# Per-process state filled by the initializer (or directly, for the thread executor)
+_worker = {}
+
+
+def set_worker_arrays(dates, close, market_range):
+    start, stop = market_range
+    _worker['dates'] = dates
+    _worker['close'] = close
+    _worker['market'] = BenchmarkContext(dates[start:stop], close[start:stop])
+
+
+def init_worker(spec, market_range, profile=False):
+    if profile:
+        profiler.enable()
+    arrays = {}
+    blocks = []
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)  # keep the mapping alive for the life of the worker
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    _worker['blocks'] = blocks
+    set_worker_arrays(arrays['dates'].view('datetime64[ns]'), arrays['close'], market_range)
+
+
+# True for a status entry that is a real failure rather than a fund with too little data
+def is_error(reason):
+    return reason is not None and not reason.startswith((NO_HISTORY, NO_WINDOWS))
+
+
+def _analyse_each(funds, metas, names, market, risk_free_rate, result_type, timelines, errors):
+    frames = []
+    for k, (fund, meta, Fund) in enumerate(zip(funds, metas, names)):
+        try:
+            result = analyse_fund(fund, market, meta, risk_free_rate, result_type,
+                                  timelines=timelines[k] if timelines else None)
+        except Exception as exc:
+            errors.setdefault(Fund, f"{result_type}: {type(exc).__name__}: {exc}")
+            continue
+        if result is not None:
+            frames.append(result)
+    return frames
+
+
+# Returns (result frame or None, {Fund: None on success, else why it produced no rows}).
+# plan, when given, maps Fund -> {result_type: timelines or None (all)}; result types missing
+# from a fund's entry are skipped (see incremental.py)
+def analyse_chunk(chunk, result_types, risk_free_rate=0.06, metrics='panel', plan=None):
+    with profiler.stage('analyse_chunk', funds=len(chunk)):
+        return _analyse_chunk(chunk, result_types, risk_free_rate, metrics, plan)
+
+
+# analyse_chunk in a profiled worker process: the chunk's profile records travel back with it
+def profiled_chunk(chunk, result_types, risk_free_rate=0.06, metrics='panel', plan=None):
+    return analyse_chunk(chunk, result_types, risk_free_rate, metrics, plan) + (profiler.active().drain(),)
+
+
+def _analyse_chunk(chunk, result_types, risk_free_rate, metrics, plan):
+    dates, close, market = _worker['dates'], _worker['close'], _worker['market']
+    funds, metas, names = [], [], []
+    errors = {}
+    for Fund, start, stop, meta in chunk:
+        # Same minimum history as Fund_Analysis
+        if stop - start <= 10:
+            errors[Fund] = f"{NO_HISTORY} ({stop - start} rows)"
+            continue
+        funds.append(SeriesArrays(dates[start:stop], close[start:stop]))
+        metas.append(meta)
+        names.append(Fund)
+
+    frames = []
+    for result_type in result_types:
+        if plan is None:
+            selected, timelines = list(range(len(funds))), None
+        else:
+            selected = [i for i, Fund in enumerate(names) if result_type in plan.get(Fund, {})]
+            timelines = [plan[names[i]][result_type] for i in selected]
+        if not selected:
+            continue
+        subset = ([funds[i] for i in selected], [metas[i] for i in selected], [names[i] for i in selected])
+        if metrics == 'panel':
+            try:
+                # One cross-sectional pass per (result_type, timeline) over all funds in the chunk
+                result = analyse_funds_panel(subset[0], market, subset[1], risk_free_rate, result_type,
+                                             timelines=timelines)
+                if result is not None:
+                    frames.append(result)
+                continue
+            except Exception:
+                pass  # redo the chunk fund by fund so the error is pinned on the fund that caused it
+        frames.extend(_analyse_each(*subset, market, risk_free_rate, result_type, timelines, errors))
+
+    with profiler.stage('concat_results', frames=len(frames)):
+        results = pd.concat(frames, ignore_index=True) if frames else None
+    produced = set() if results is None else set(results['Fund'])
+    status = {}
+    for Fund, *_ in chunk:
+        if Fund in errors:
+            status[Fund] = errors[Fund]
+        elif Fund not in produced:
+            status[Fund] = NO_WINDOWS
+        else:
+            status[Fund] = None
+    return results, status
+
+
+def fund_chunks(df, fund_slices, chunk_size=DEFAULT_CHUNK_SIZE):
+    starts = [start for start, _ in fund_slices.values()]
+    meta = df[[col for col in META_COLUMNS if col in df.columns]].iloc[starts].to_dict('records')
+    tasks = [(Fund, start, stop, m) for (Fund, (start, stop)), m in zip(fund_slices.items(), meta)]
+    return [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+
+
+def _completed(futures):
+    for future in as_completed(futures):
+        try:
+            results, status, *records = future.result()
+            if records and profiler.is_enabled():
+                profiler.active().merge(records[0])
+        except Exception as exc:
+            results = None
+            status = {Fund: f"{type(exc).__name__}: {exc}" for Fund, *_ in futures[future]}
+        yield status, results
+
+
+# Yields ({Fund: None or error} for the chunk, result frame or None) as chunks complete; a chunk
+# whose task itself fails (e.g. a crashed worker) reports the error for each of its funds
+def run_fund_pool(df, fund_slices, result_types, benchmark='Nifty 50', risk_free_rate=0.06,
+                  workers=None, chunk_size=DEFAULT_CHUNK_SIZE, executor='process', metrics='panel', plan=None):
+    workers = workers or os.cpu_count()
+    market_range = fund_slices[benchmark]
+    # With a plan only the funds it names are analysed; each chunk carries its part of the plan
+    if plan is not None:
+        fund_slices = {Fund: bounds for Fund, bounds in fund_slices.items() if Fund in plan}
+    chunks = fund_chunks(df, fund_slices, chunk_size)
+    chunk_plans = [None if plan is None else {Fund: plan[Fund] for Fund, *_ in chunk} for chunk in chunks]
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    close = df['Close'].to_numpy(dtype=float)
+
+    if executor == 'thread':
+        set_worker_arrays(dates, close, market_range)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(analyse_chunk, chunk, result_types, risk_free_rate, metrics, chunk_plan): chunk
+                       for chunk, chunk_plan in zip(chunks, chunk_plans)}
+            yield from _completed(futures)
+        return
+
+    profile = profiler.is_enabled()
+    task = profiled_chunk if profile else analyse_chunk
+    with SharedNavArrays(dates, close) as shared, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                initargs=(shared.spec, market_range, profile)) as pool:
+        futures = {pool.submit(task, chunk, result_types, risk_free_rate, metrics, chunk_plan): chunk
+                   for chunk, chunk_plan in zip(chunks, chunk_plans)}
+        yield from _completed(futures)
@@ -0,0 +1,120 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from window_engine import date_ranges
+from Fund_Analysis import analysis_end_date
+
+# Incremental recomputation for the daily job. A state file next to the output records, per fund
+# and result_type, the analysis end date ("anchor") its rows were computed for. On the next run:
+#   - funds whose anchor has not moved are skipped; for 'default' the anchor is the last month
+#     end, so it only moves once a month;
+#   - for funds whose anchor moved, only timelines whose window ends after the old anchor are
+#     recomputed (the fixed calendar years before it cannot change);
+#   - 'All' is not bounded by the anchor and covers every NAV, so it is also recomputed when only
+#     the fund's last NAV date (kept in the state next to the anchors) moved;
+#   - funds not in the state are computed in full.
+# The recomputed (Fund, timeline, result_type) rows replace the old ones in final_data, and rows
+# of funds no longer in the input are dropped. A change of run parameters (benchmark, risk-free
+# rate, ...) invalidates the state and forces a full run.
+
+STATE_SUFFIX = '.state.json'
+ROW_KEY = ['Fund', 'timeline', 'result_type']
+
+
+def state_path(output):
+    return output.rstrip('/\\') + STATE_SUFFIX
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Date of every fund's last valid NAV
+def last_nav_dates(df, fund_slices):
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    valid = ~(np.isnat(dates) | df['Close'].isna().to_numpy())
+    last_navs = {}
+    for Fund, (start, stop) in fund_slices.items():
+        rows = np.flatnonzero(valid[start:stop])
+        if len(rows):
+            last_navs[Fund] = pd.Timestamp(dates[start + rows[-1]]).strftime('%Y-%m-%d')
+    return last_navs
+
+
+# Analysis end date of every fund per result_type, from its last valid NAV
+def fund_anchors(last_navs, result_types):
+    return {Fund: {rt: analysis_end_date(pd.Timestamp(last), rt).strftime('%Y-%m-%d') for rt in result_types}
+            for Fund, last in last_navs.items()}
+
+
+def affected_timelines(old_anchor, new_anchor):
+    old_anchor = pd.Timestamp(old_anchor)
+    return [timeline for timeline, date_range in date_ranges(pd.Timestamp(new_anchor)).items()
+            if date_range is None or pd.Timestamp(date_range[1]) > old_anchor]
+
+
+# Fund -> {result_type: timelines to recompute, or None for all}; funds with nothing to do are left out.
+# A fund whose anchors held but whose last NAV moved (or is not in the state) has 'All' recomputed.
+def plan_updates(anchors, previous, last_navs, previous_last_navs):
+    plan = {}
+    for Fund, fund_anchor in anchors.items():
+        old = previous.get(Fund, {})
+        nav_moved = last_navs.get(Fund) != previous_last_navs.get(Fund)
+        jobs = {}
+        for rt, anchor in fund_anchor.items():
+            if rt not in old:
+                jobs[rt] = None
+            elif pd.Timestamp(anchor) != pd.Timestamp(old[rt]):
+                jobs[rt] = affected_timelines(old[rt], anchor)
+            elif nav_moved:
+                jobs[rt] = ['All']
+        if jobs:
+            plan[Fund] = jobs
+    return plan
+
+
+# Funds with rows in the existing results that are no longer in the input
+def stale_funds(existing, funds):
+    if existing is None or existing.empty:
+        return []
+    return sorted(set(existing['Fund'].dropna().unique()) - set(funds))
+
+
+# Drops the rows the plan recomputes, and those of the stale funds, from the existing results and
+# appends the new ones
+def merge_results(existing, updates, plan, stale=()):
+    if existing is None or existing.empty:
+        return updates
+    if len(stale):
+        existing = existing[~existing['Fund'].isin(stale)]
+    replaced = []
+    for Fund, jobs in plan.items():
+        for rt, timelines in jobs.items():
+            if timelines is None:
+                replaced.append((Fund, rt, None))
+            else:
+                replaced.extend((Fund, rt, timeline) for timeline in timelines)
+    keys = pd.DataFrame(replaced, columns=['Fund', 'result_type', 'timeline'])
+    full = keys[keys['timeline'].isna()][['Fund', 'result_type']].drop_duplicates()
+    partial = keys[keys['timeline'].notna()].drop_duplicates()
+
+    drop = pd.Series(False, index=existing.index)
+    if not full.empty:
+        drop |= pd.MultiIndex.from_frame(existing[['Fund', 'result_type']]).isin(pd.MultiIndex.from_frame(full))
+    if not partial.empty:
+        drop |= pd.MultiIndex.from_frame(existing[ROW_KEY]).isin(pd.MultiIndex.from_frame(partial[ROW_KEY]))
+    kept = existing[~drop.to_numpy()]
+    if updates is None or updates.empty:
+        return kept.reset_index(drop=True)
+    return pd.concat([kept, updates], ignore_index=True)
@@ -11,48 +11,78 @@ def omega_ratio(returns, threshold=0):
     denominator = -excess_returns[excess_returns < 0].sum()
     return numerator / (denominator if denominator != 0 else np.nan)
 
-# Function to calculate Max Drawdown and Drawdown Dates
-def max_drawdown(nav):
-    if nav is None or nav.empty or nav.isna().all():
-        return np.nan, pd.NaT, pd.NaT
+# Fused drawdown kernel: one pass of cummax/argmax over a NAV array gives the max drawdown with
+# the row positions of its peak, trough and recovery (-1 when absent). nav may be one series or a
+# (dates x series) matrix with NaN where a series has no value; results are per series.
+def drawdown_kernel(nav, mask=None):
+    nav = np.asarray(nav, dtype=float)
+    single = nav.ndim == 1
+    if single:
+        nav = nav[:, None]
+    mask = ~np.isnan(nav) if mask is None else (np.asarray(mask).reshape(nav.shape) & ~np.isnan(nav))
+    values = np.where(mask, nav, np.nan)
+    peak = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = (peak - values) / peak
+    usable = mask & ~np.isnan(drawdown)
+    has_data = usable.any(axis=0)
+    cols = np.arange(nav.shape[1])
+    trough = np.where(has_data, np.where(usable, drawdown, -np.inf).argmax(axis=0), -1)
+    safe_trough = np.maximum(trough, 0)
+    max_dd = np.where(has_data, drawdown[safe_trough, cols], np.nan)
+    peak_value = np.where(has_data, peak[safe_trough, cols], np.nan)
+    rows = np.arange(nav.shape[0])[:, None]
+    at_peak = mask & (peak == peak_value)
+    recovered = mask & (rows >= trough) & (values >= peak_value)
+    result = {
+        'max_drawdown': max_dd,
+        'peak': np.where(has_data & at_peak.any(axis=0), at_peak.argmax(axis=0), -1),
+        'trough': trough,
+        'recovery': np.where(has_data & recovered.any(axis=0), recovered.argmax(axis=0), -1),
+        # Last valid row, so time under water can run to the end of an unrecovered series
+        'last': np.where(mask.any(axis=0), nav.shape[0] - 1 - mask[::-1].argmax(axis=0), -1),
+    }
+    return {key: value[0] for key, value in result.items()} if single else result
+
+# Drawdown, recovery, time under water and (given the annualised return) Calmar of one NAV
+# Series from a single drawdown_kernel call; dates come from the Series index
+def drawdown_summary(nav, annualized_return=None):
+    summary = {'max_drawdown': np.nan, 'peak_date': pd.NaT, 'trough_date': pd.NaT,
+               'recovery_time': None, 'recovery_date': None, 'time_under_water': None, 'calmar': np.nan}
+    if nav is None or nav.empty:
+        return summary
     nav = nav.dropna()
     if nav.empty:
-        return np.nan, pd.NaT, pd.NaT
-    peak = nav.cummax()
-    drawdown = (peak - nav) / peak
-    max_dd = drawdown.max()
-    if pd.isna(max_dd):
-        return np.nan, pd.NaT, pd.NaT
-    max_dd_index = drawdown.idxmax()
+        return summary
+    stats = drawdown_kernel(nav.to_numpy(dtype=float))
+    if stats['trough'] < 0:
+        return summary
+    index = nav.index
+    summary['max_drawdown'] = stats['max_drawdown']
+    summary['peak_date'] = index[stats['peak']]
+    summary['trough_date'] = index[stats['trough']]
     try:
-        peak_before_drawdown = peak.loc[max_dd_index]
-        peak_date = peak[peak == peak_before_drawdown].index[0]
-        trough_date = max_dd_index
+        if stats['recovery'] >= 0:
+            summary['recovery_date'] = index[stats['recovery']]
+            summary['recovery_time'] = (summary['recovery_date'] - summary['trough_date']).days
+        under_water_end = index[stats['recovery']] if stats['recovery'] >= 0 else index[stats['last']]
+        summary['time_under_water'] = (under_water_end - summary['peak_date']).days
     except Exception:
-        peak_date = pd.NaT
-        trough_date = pd.NaT
-    return max_dd, peak_date, trough_date
+        summary['recovery_time'] = summary['recovery_date'] = summary['time_under_water'] = None
+    if annualized_return is not None:
+        max_dd = summary['max_drawdown']
+        summary['calmar'] = annualized_return / (max_dd if max_dd not in [0, np.nan] else np.nan)
+    return summary
+
+# Function to calculate Max Drawdown and Drawdown Dates
+def max_drawdown(nav):
+    summary = drawdown_summary(nav)
+    return summary['max_drawdown'], summary['peak_date'], summary['trough_date']
 
 # Function to calculate Recovery Time and Recovery Date
 def recovery_time(nav):
-    if nav is None or nav.empty or nav.isna().all():
-        return None, None
-    nav = nav.dropna()
-    if nav.empty:
-        return None, None
-    peak = nav.cummax()
-    drawdown = (peak - nav) / peak
-    max_dd_index = drawdown.idxmax()
-    try:
-        peak_before_drawdown = peak.loc[max_dd_index]
-        recovery_indices = nav[nav.index >= max_dd_index][nav >= peak_before_drawdown]
-        if recovery_indices.empty:
-            return None, None
-        recovery_index = recovery_indices.index[0]
-        recovery_time_days = (recovery_index - max_dd_index).days
-        return recovery_time_days, recovery_index
-    except Exception:
-        return None, None
+    summary = drawdown_summary(nav)
+    return summary['recovery_time'], summary['recovery_date']
 
 # Function to calculate Calmar Ratio
 def calmar_ratio(returns, nav, frequency='monthly'):
@@ -66,8 +96,7 @@ def calmar_ratio(returns, nav, frequency='monthly'):
         annualized_return = returns.mean() * 12
     else:
         raise ValueError("Frequency must be 'daily', 'weekly', or 'monthly'.")
-    max_dd = max_drawdown(nav)[0]  # Only need the drawdown value
-    return annualized_return / (max_dd if max_dd not in [0, np.nan] else np.nan)
+    return drawdown_summary(nav, annualized_return)['calmar']
 
 # Function to calculate Beta, Alpha, and R-squared
 def calculate_beta_alpha_r2(returns, market_returns, annual_rate):
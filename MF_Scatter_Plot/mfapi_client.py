@@ -0,0 +1,326 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+import numpy as np
+import pandas as pd
+import httpx
+from tqdm import tqdm
+
+# Asyncio ingestion engine for api.mfapi.in, used by fetch_api_data.py. Pooled httpx clients
+# keep connections alive across the whole run instead of opening one per request, and every
+# request goes through the same three gates:
+#   - a queue of free slots, one per pooled connection, bounding the requests in flight to
+#     concurrency (httpcore rescans its whole pool for every request it assigns, which grows
+#     with the square of the pool size, so the connections are spread over clients of
+#     POOL_SHARD connections each and a slot also says which client to use);
+#   - a token bucket per host limiting the request rate to rate per second (burst of one second);
+#   - up to retries retries on timeouts, connection errors, 429 and 5xx, each after a jittered
+#     exponential backoff, uniform(0, min(backoff_max, backoff * 2**attempt)), or the server's
+#     Retry-After when that is longer. The backoff sleeps without a slot, so one failing
+#     scheme does not hold a connection while it waits.
+# Responses are parsed as they arrive without pandas' per-string date parser, which would
+# otherwise cost more CPU than the HTTP itself and make the run CPU-bound.
+# FetchStats counts requests, retries, failures by kind, bytes and latencies, and reports
+# throughput as requests/s and MB/s. base_url (default $MFAPI_URL or https://api.mfapi.in) can
+# point at a local server such as mfapi_stub.py for offline runs:
+#   python mfapi_stub.py --port 8765 --failure-rate 0.02 &
+#   python mfapi_client.py --base-url http://127.0.0.1:8765 --limit 500
+
+API_URL = os.environ.get('MFAPI_URL', 'https://api.mfapi.in')
+CONCURRENCY = 32
+POOL_SHARD = 8
+RATE = 100.0
+RETRIES = 4
+BACKOFF = 0.5
+BACKOFF_MAX = 30.0
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DETAIL_COLUMNS = ['schemeCode', 'fund_house', 'scheme_type', 'scheme_category',
+                  'scheme_start_date', 'scheme_start_nav']
+
+
+# Token bucket: rate tokens a second, at most burst banked; waiters are served in turn
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# mfapi.in's dd-mm-yyyy dates as datetime64[ns]: rearranged to ISO for NumPy's parser, with
+# pandas (unparseable -> NaT) only for a list NumPy rejects
+def parse_dates(dates):
+    try:
+        iso = np.array([f"{date[6:10]}-{date[3:5]}-{date[:2]}" for date in dates], dtype='datetime64[D]')
+    except (TypeError, ValueError):
+        return pd.to_datetime(pd.Series(dates, dtype=object), format='%d-%m-%Y', errors='coerce').to_numpy()
+    return iso.astype('datetime64[ns]')
+
+
+def parse_navs(navs):
+    try:
+        return np.array(navs, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(navs, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+
+def backoff_delay(attempt, backoff=BACKOFF, backoff_max=BACKOFF_MAX, rng=random):
+    return rng.uniform(0, min(backoff_max, backoff * 2 ** attempt))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return 0.0
+
+
+class FetchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.ok = 0
+        self.retries = 0
+        self.failed = 0
+        self.bytes = 0
+        self.errors = Counter()
+        self.latencies = []
+
+    def response(self, response, latency):
+        self.bytes += len(response.content)
+        self.latencies.append(latency)
+        if response.status_code == 200:
+            self.ok += 1
+
+    def error(self, kind):
+        self.errors[kind] += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': self.requests,
+            'ok': self.ok,
+            'retries': self.retries,
+            'failed': self.failed,
+            'errors': dict(self.errors.most_common()),
+            'elapsed_s': elapsed,
+            'requests_per_s': self.ok / elapsed if elapsed else None,
+            'MB': self.bytes / 2 ** 20,
+            'MB_per_s': self.bytes / 2 ** 20 / elapsed if elapsed else None,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else None,
+        }
+
+
+def format_stats(summary):
+    text = (f"{summary['ok']:,} ok / {summary['requests']:,} requests in {summary['elapsed_s']:,.1f}s "
+            f"({summary['requests_per_s'] or 0:,.1f} req/s, {summary['MB']:,.1f} MB at "
+            f"{summary['MB_per_s'] or 0:,.2f} MB/s); {summary['retries']:,} retries, {summary['failed']:,} failed")
+    if summary['latency_p50_ms'] is not None:
+        text += f"; latency p50 {summary['latency_p50_ms']:,.0f} ms, p95 {summary['latency_p95_ms']:,.0f} ms"
+    if summary['errors']:
+        text += "\nerrors: " + ", ".join(f"{kind} x{count}" for kind, count in summary['errors'].items())
+    return text
+
+
+class MfApiClient:
+    def __init__(self, base_url=API_URL, concurrency=CONCURRENCY, rate=RATE, retries=RETRIES,
+                 backoff=BACKOFF, backoff_max=BACKOFF_MAX, timeout=TIMEOUT, seed=None):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.stats = FetchStats()
+        self.clients = []
+        self._limiters = {}
+        self._slots = None
+
+    async def __aenter__(self):
+        shards = -(-self.concurrency // POOL_SHARD)
+        limits = httpx.Limits(max_connections=POOL_SHARD, max_keepalive_connections=POOL_SHARD)
+        self.clients = [httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits)
+                        for _ in range(shards)]
+        self._slots = asyncio.Queue()
+        for slot in range(self.concurrency):
+            self._slots.put_nowait(slot % shards)
+        self.stats = FetchStats()
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.gather(*(client.aclose() for client in self.clients))
+
+    def _limiter(self, host):
+        if host not in self._limiters:
+            self._limiters[host] = RateLimiter(self.rate)
+        return self._limiters[host]
+
+    # Decoded JSON of a GET, or None once the retries are spent or the status is not retryable
+    async def get_json(self, path):
+        url = self.clients[0].base_url.join(path)
+        limiter = self._limiter(url.host)
+        for attempt in range(self.retries + 1):
+            wait = 0.0
+            shard = await self._slots.get()
+            try:
+                await limiter.acquire()
+                self.stats.requests += 1
+                start = time.perf_counter()
+                try:
+                    response = await self.clients[shard].get(url)
+                except httpx.TransportError as e:
+                    kind = type(e).__name__
+                else:
+                    self.stats.response(response, time.perf_counter() - start)
+                    if response.status_code == 200:
+                        try:
+                            return response.json()
+                        except ValueError:
+                            self.stats.error('invalid JSON')
+                            break
+                    kind = f"HTTP {response.status_code}"
+                    if response.status_code not in RETRY_STATUS:
+                        self.stats.error(kind)
+                        break
+                    wait = _retry_after(response)
+            finally:
+                self._slots.put_nowait(shard)
+            self.stats.error(kind)
+            if attempt < self.retries:
+                self.stats.retries += 1
+                await asyncio.sleep(max(wait, backoff_delay(attempt, self.backoff, self.backoff_max, self.rng)))
+        self.stats.failed += 1
+        return None
+
+    # await func(item) for every item, concurrently (the gates above do the bounding), results in item order
+    async def map(self, func, items, desc=None):
+        items = list(items)
+        results = [None] * len(items)
+
+        async def run(i, item):
+            results[i] = await func(item)
+
+        with tqdm(total=len(items), desc=desc, disable=desc is None) as pbar:
+            for done in asyncio.as_completed([run(i, item) for i, item in enumerate(items)]):
+                await done
+                pbar.update(1)
+        return results
+
+    # Scheme master list: schemeCode, schemeName, ISINs
+    async def scheme_master(self):
+        data = await self.get_json('/mf')
+        if data is None:
+            raise RuntimeError(f"Could not fetch the scheme list from {self.base_url}/mf")
+        return pd.DataFrame(data)
+
+    # Date of the scheme's latest NAV, or None
+    async def latest_date(self, code):
+        data = await self.get_json(f'/mf/{code}/latest')
+        if not data or not data.get('data'):
+            return None
+        return pd.Timestamp(parse_dates([data['data'][0].get('date')])[0])
+
+    # (fact frame of schemeCode int32, date, nav; scheme details from the response's meta), or None.
+    # The details are what mftool's get_scheme_details reads from this same response.
+    async def nav_history(self, code):
+        data = await self.get_json(f'/mf/{code}')
+        if data is None:
+            return None
+        rows = data.get('data') or []
+        facts = pd.DataFrame({
+            'schemeCode': np.full(len(rows), code, dtype='int32'),
+            'date': parse_dates([row.get('date') for row in rows]),
+            'nav': parse_navs([row.get('nav') for row in rows]),
+        })
+        meta = data.get('meta') or {}
+        first = rows[-1] if rows else {}
+        details = {
+            'schemeCode': code,
+            'fund_house': meta.get('fund_house'),
+            'scheme_type': meta.get('scheme_type'),
+            'scheme_category': meta.get('scheme_category'),
+            'scheme_start_date': first.get('date'),
+            'scheme_start_nav': first.get('nav'),
+        }
+        return facts, details
+
+
+# Scheme master, active codes (latest NAV on or after threshold_date), and (facts, details) per
+# active scheme; limit keeps only the first schemes of the master list (for trial runs). A
+# scheme's history is requested as soon as its /latest shows it active, so the two passes
+# overlap instead of the history pass waiting for the slowest /latest.
+async def ingest(threshold_date, limit=None, **client_options):
+    threshold = pd.Timestamp(threshold_date)
+
+    async with MfApiClient(**client_options) as client:
+        async def active_history(code):
+            date = await client.latest_date(code)
+            if date is None or not date >= threshold:
+                return False, None
+            return True, await client.nav_history(code)
+
+        master = await client.scheme_master()
+        codes = master['schemeCode'].tolist()[:limit]
+        results = await client.map(active_history, codes, desc="Fetching active schemes")
+    active = [code for code, (is_active, _) in zip(codes, results) if is_active]
+    print(f"Active schemes found: {len(active)}")
+    histories = [history for _, history in results if history is not None]
+    return master, active, histories, client.stats.summary()
+
+
+# (nav facts, details frame) from ingest's histories, as fetch_api_data.py stores them
+def combine_histories(histories):
+    facts = [facts for facts, _ in histories if not facts.empty]
+    nav_facts = pd.concat(facts, ignore_index=True) if facts else pd.DataFrame(
+        {'schemeCode': pd.Series(dtype='int32'), 'date': pd.Series(dtype='datetime64[ns]'), 'nav': pd.Series(dtype=float)})
+    details = pd.DataFrame([details for _, details in histories], columns=DETAIL_COLUMNS)
+    return nav_facts, details
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch the active mutual fund universe from mfapi.in.")
+    parser.add_argument('--base-url', default=API_URL, help="API root, e.g. a local mfapi_stub.py")
+    parser.add_argument('--limit', type=int, default=None, help="only the first N schemes of the master list")
+    parser.add_argument('--active-days', type=int, default=5, help="active = NAV within this many days")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="requests in flight")
+    parser.add_argument('--rate', type=float, default=RATE, help="requests per second per host")
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    parser.add_argument('--output', default=None, help="write the NAV facts to this CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    threshold_date = pd.Timestamp.today().normalize() - pd.Timedelta(days=args.active_days)
+    master, active, histories, stats = asyncio.run(ingest(
+        threshold_date, args.limit, base_url=args.base_url, concurrency=args.concurrency, rate=args.rate,
+        retries=args.retries))
+    nav_facts, details = combine_histories(histories)
+    print(f"{len(nav_facts):,} NAV rows for {len(histories):,} of {len(active):,} active schemes")
+    print(format_stats(stats))
+    if args.output:
+        nav_facts.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
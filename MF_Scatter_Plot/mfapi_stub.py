@@ -0,0 +1,152 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from synthetic_nav import synthetic_nav_frame
+
+# Local stand-in for api.mfapi.in, serving a synthetic universe (see synthetic_nav.py) in the
+# API's JSON layout, so mfapi_client.py and fetch_api_data.py can run offline:
+#   GET /mf                 [{schemeCode, schemeName}, ...]
+#   GET /mf/<code>/latest   {meta, data: [latest {date, nav}], status}
+#   GET /mf/<code>          {meta, data: [every {date, nav}, newest first], status}
+# Responses are rendered once up front and served over HTTP/1.1 keep-alive. --latency adds a
+# fixed delay per request, --failure-rate answers that fraction of requests with 503 (some with
+# Retry-After) to exercise the client's retries, and --inactive ends that fraction of schemes'
+# histories a month early so the active filter has something to drop. The server counts the
+# requests and connections it saw, which shows whether the client reuses connections.
+
+INACTIVE_DAYS = 30
+
+
+def _meta(code, Fund, scheme_category, fund_house):
+    return {
+        'fund_house': fund_house,
+        'scheme_type': 'Open Ended Schemes',
+        'scheme_category': scheme_category,
+        'scheme_code': int(code),
+        'scheme_name': Fund,
+        'isin_growth': None,
+        'isin_div_reinvestment': None,
+    }
+
+
+# {path: JSON bytes} for every route of a synthetic NAV frame (benchmark rows excluded)
+def render_routes(df, inactive=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    df = df[df['Category'] != 'Benchmark']
+    master, routes = [], {}
+    for code, fund in df.groupby('scheme_code', sort=True):
+        if rng.random() < inactive:
+            fund = fund[fund['Date'] <= fund['Date'].max() - pd.Timedelta(days=INACTIVE_DAYS)]
+        fund = fund.sort_values('Date', ascending=False)
+        first = fund.iloc[0] if len(fund) else df[df['scheme_code'] == code].iloc[0]
+        meta = _meta(code, first['Fund'], first['scheme_category'], first['fund_house'])
+        data = [{'date': date, 'nav': f"{nav:.5f}"}
+                for date, nav in zip(fund['Date'].dt.strftime('%d-%m-%Y'), fund['Close'])]
+        routes[f'/mf/{code}'] = json.dumps({'meta': meta, 'data': data, 'status': 'SUCCESS'}).encode()
+        routes[f'/mf/{code}/latest'] = json.dumps({'meta': meta, 'data': data[:1], 'status': 'SUCCESS'}).encode()
+        master.append({'schemeCode': int(code), 'schemeName': meta['scheme_name']})
+    routes['/mf'] = json.dumps(master).encode()
+    return routes
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY every keep-alive response
+    # waits ~40 ms on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.rng.random() < server.failure_rate
+        if server.latency:
+            time.sleep(server.latency)
+        body = server.routes.get(self.path.rstrip('/'))
+        if fail:
+            self._send(503, b'{"status": "ERROR"}', {'Retry-After': '0'} if server.rng.random() < 0.5 else {})
+        elif body is None:
+            self._send(404, b'{"status": "ERROR"}')
+        else:
+            self._send(200, body)
+
+    def _send(self, status, body, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops the SYNs of a client opening its pool at once
+    request_queue_size = 128
+
+    def __init__(self, routes, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, seed=0):
+        super().__init__((host, port), StubHandler)
+        self.routes = routes
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+# A StubServer for a synthetic universe ending today, serving from a daemon thread; call
+# shutdown() when done. port=0 picks a free port (see .url).
+def start_stub(n_funds=200, years=10, seed=0, port=0, latency=0.0, failure_rate=0.0, inactive=0.1):
+    df = synthetic_nav_frame(n_funds, years, seed, end=pd.Timestamp.today().normalize())
+    server = StubServer(render_routes(df, inactive, seed), port=port, latency=latency,
+                        failure_rate=failure_rate, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a synthetic mfapi.in on localhost.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--funds', type=int, default=200)
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument('--inactive', type=float, default=0.1, help="fraction of schemes with no recent NAV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = start_stub(args.funds, args.years, args.seed, args.port, args.latency, args.failure_rate, args.inactive)
+    print(f"Serving {args.funds} synthetic schemes at {server.url}/mf (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"{server.requests} requests over {server.connections} connections")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import json
+import numpy as np
+import pandas as pd
+from window_engine import fund_windows, align_market, simple_returns, SeriesArrays, META_COLUMNS
+from benchmark_context import BenchmarkContext
+from panel_metrics import ANNUAL_RATES, relative_metrics
+from profiler import stage
+
+# Benchmark-relative metrics against category indices. A benchmark map assigns every
+# scheme_category one or more benchmark series (by their Fund name in the NAV frame, as
+# fetch_benchmark_data adds them); categories not in the map use the '*' entry, or the run's
+# --benchmark. For each fund, beta, alpha, R^2, Treynor and the capture ratios against every
+# assigned benchmark over every timeline come out of one batched pass: each (timeline,
+# benchmark) pair is a column of a padded returns matrix and panel_metrics.relative_metrics
+# regresses all columns at once, so extra benchmarks add columns, not passes.
+# Each benchmark is aligned to the fund exactly as the single benchmark is in Fund_Analysis,
+# so the row for the run's main benchmark matches final_data.
+
+DEFAULT_BENCHMARK_MAP = {
+    'Equity Scheme - Large Cap Fund': ['Nifty 100', 'Nifty 50'],
+    'Equity Scheme - Large & Mid Cap Fund': ['Nifty LargeMidcap 250', 'Nifty 50'],
+    'Equity Scheme - Mid Cap Fund': ['Nifty Midcap 150', 'Nifty 50'],
+    'Equity Scheme - Small Cap Fund': ['Nifty Smallcap 250', 'Nifty 50'],
+    'Equity Scheme - Multi Cap Fund': ['Nifty 500 Multicap 50:25:25', 'Nifty 500', 'Nifty 50'],
+    'Equity Scheme - Flexi Cap Fund': ['Nifty 500', 'Nifty 50'],
+    'Equity Scheme - Focused Fund': ['Nifty 500', 'Nifty 50'],
+    'Equity Scheme - ELSS': ['Nifty 500', 'Nifty 50'],
+    'Equity Scheme - Value Fund': ['Nifty 500', 'Nifty 50'],
+    'Equity Scheme - Contra Fund': ['Nifty 500', 'Nifty 50'],
+    'Equity Scheme - Dividend Yield Fund': ['Nifty 500', 'Nifty 50'],
+    'Equity Scheme - Sectoral/ Thematic': ['Nifty 500', 'Nifty 50'],
+}
+
+BENCHMARK_COLUMNS = [
+    'Fund', 'Category_Name', 'Scheme_code', 'Category', 'Fund_house', 'timeline', 'Benchmark',
+    'beta_value', 'alpha', 'r_squared', 'treynor_ratio', 'downside_capture', 'upside_capture', 'result_type',
+]
+BENCHMARKS_SUFFIX = '_benchmarks'
+
+
+# The per-benchmark table sits next to the metrics output (final_data_benchmarks.csv, or
+# <dir>_benchmarks for a Parquet output) and never replaces it
+def benchmarks_path(output):
+    if output.lower().endswith('.csv'):
+        return output[:-4] + BENCHMARKS_SUFFIX + '.csv'
+    return output.rstrip('/\\') + BENCHMARKS_SUFFIX
+
+
+# 'default' or a JSON file of {scheme_category: benchmark name or [names]}
+def load_benchmark_map(path):
+    if path == 'default':
+        return dict(DEFAULT_BENCHMARK_MAP)
+    with open(path) as f:
+        raw = json.load(f)
+    return {category: [names] if isinstance(names, str) else list(names) for category, names in raw.items()}
+
+
+# Benchmarks for a category, in map order, limited to the ones the NAV frame holds
+def assigned_benchmarks(benchmark_map, category, available, default='Nifty 50'):
+    names = benchmark_map.get(category) or benchmark_map.get('*') or [default]
+    names = [name for name in dict.fromkeys(names) if name in available]
+    return names or ([default] if default in available else [])
+
+
+# One BenchmarkContext per benchmark named anywhere in the map (plus the default) that has rows
+def benchmark_contexts(df, fund_slices, benchmark_map, default='Nifty 50'):
+    names = {default}.union(*benchmark_map.values())
+    contexts = {}
+    for name in sorted(names):
+        if name in fund_slices:
+            start, stop = fund_slices[name]
+            contexts[name] = BenchmarkContext.from_frame(df.iloc[start:stop])
+    return contexts
+
+
+# Relative metrics of one fund against several benchmarks over all its windows, as result rows.
+# benchmarks is a list of (name, BenchmarkContext).
+def benchmark_relative_metrics(fund, benchmarks, meta, risk_free_rate=0.06, result_type='default', max_date=None):
+    from Fund_Analysis import analysis_end_date
+
+    if len(fund) == 0 or not benchmarks:
+        return None
+    if max_date is None:
+        max_date = analysis_end_date(pd.Timestamp(fund.dates[-1]), result_type)
+
+    columns = []
+    for timeline, freq, start_date, end_date, fund_bounds in fund_windows(fund, max_date):
+        f_labels, f_close = fund.resampled(freq, *fund_bounds)
+        f_returns = simple_returns(f_close)
+        for name, context in benchmarks:
+            aligned = align_market(f_labels, context.window(freq, start_date, end_date))
+            if aligned is not None:
+                keep, market_returns = aligned
+                columns.append((timeline, name, ANNUAL_RATES[freq], f_returns[keep], market_returns))
+    if not columns:
+        return None
+
+    # Windows differ in length; pad every column to the longest with NaN (outside the mask)
+    shape = (max(len(column[3]) for column in columns), len(columns))
+    returns = np.full(shape, np.nan)
+    market_returns = np.full(shape, np.nan)
+    for j, (_, _, _, r, m) in enumerate(columns):
+        returns[:len(r), j] = r
+        market_returns[:len(m), j] = m
+    mask = ~np.isnan(returns)
+    annual_rates = np.array([column[2] for column in columns], dtype=float)
+    metrics = relative_metrics(returns, market_returns, mask, annual_rates, risk_free_rate)
+
+    valid = mask.any(axis=0)
+    frame = pd.DataFrame({
+        'Fund': meta.get('Fund'),
+        'Category_Name': meta.get('scheme_category'),
+        'Scheme_code': meta.get('scheme_code'),
+        'Category': meta.get('Category'),
+        'Fund_house': meta.get('fund_house'),
+        'timeline': [column[0] for column in columns],
+        'Benchmark': [column[1] for column in columns],
+        **metrics,
+        'result_type': result_type,
+    })
+    return frame[valid].reset_index(drop=True)[BENCHMARK_COLUMNS]
+
+
+# Yields (Fund, frame or None) for every fund, against the benchmarks the map assigns to its category
+def iter_benchmark_metrics(df, fund_slices, benchmark_map, result_types, default='Nifty 50', risk_free_rate=0.06):
+    contexts = benchmark_contexts(df, fund_slices, benchmark_map, default)
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    close = df['Close'].to_numpy(dtype=float)
+    meta_columns = [col for col in META_COLUMNS if col in df.columns]
+    for Fund, (start, stop) in fund_slices.items():
+        if stop - start <= 10:
+            yield Fund, None
+            continue
+        meta = {col: df[col].iat[start] for col in meta_columns}
+        benchmarks = [(name, contexts[name])
+                      for name in assigned_benchmarks(benchmark_map, meta.get('scheme_category'), contexts, default)]
+        fund = SeriesArrays(dates[start:stop], close[start:stop])
+        frames = []
+        with stage('benchmark_metrics', Fund, benchmarks=len(benchmarks)):
+            for result_type in result_types:
+                frame = benchmark_relative_metrics(fund, benchmarks, meta, risk_free_rate, result_type)
+                if frame is not None:
+                    frames.append(frame)
+        yield Fund, pd.concat(frames, ignore_index=True) if frames else None
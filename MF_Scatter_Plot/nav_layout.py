@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# Compact layout for the combined NAV frame. Every daily row used to carry the fund's name,
+# house, category and type as Python strings; here those live once per scheme:
+#   facts   - one row per NAV: scheme_code (int32), Date (datetime64), Close (float64 or float32)
+#   schemes - one row per scheme_code with its descriptive columns as categoricals
+# compact_frame() applies the same idea to a wide frame in place of the split (categoricals
+# and narrow numbers), for code that still wants one frame. memory_report() shows the effect.
+#
+# Rows without a scheme_code (the benchmark rows added from fetch_benchmark_data) get negative
+# codes, one per Fund name, so every fact row still has an int32 key.
+
+KEY = 'scheme_code'
+FACT_COLUMNS = ['Date', 'Close']
+
+
+def scheme_codes(df, key=KEY, name_col='Fund'):
+    codes = pd.to_numeric(df[key], errors='coerce') if key in df.columns else pd.Series(np.nan, index=df.index)
+    missing = codes.isna()
+    if missing.any():
+        # factorize keeps first-seen order, so the benchmark gets -1, the next unnamed fund -2, ...
+        labels, _ = pd.factorize(df.loc[missing, name_col])
+        codes = codes.copy()
+        codes[missing] = -(labels + 1)
+    return codes.astype('int32')
+
+
+def _categorize(df, exclude=()):
+    for col in df.columns:
+        if col not in exclude and (df[col].dtype == object or pd.api.types.is_string_dtype(df[col].dtype)):
+            df[col] = df[col].astype('category')
+    return df
+
+
+# (facts, schemes) from a wide NAV frame such as final.csv or active_funds_nav_history.csv.
+# Columns that vary within a scheme (other than Date/Close) are left out of the dimension.
+def split_nav_frame(df, nav_dtype='float64', key=KEY):
+    codes = scheme_codes(df, key)
+    facts = pd.DataFrame({
+        key: codes.to_numpy(),
+        'Date': pd.to_datetime(df['Date'], errors='coerce').to_numpy(),
+        'Close': pd.to_numeric(df['Close'], errors='coerce').astype(nav_dtype).to_numpy(),
+    })
+
+    attributes = df.drop(columns=[col for col in FACT_COLUMNS + [key] if col in df.columns])
+    attributes.insert(0, key, codes.to_numpy())
+    first = attributes.drop_duplicates(key)
+    # Keep only columns with a single value per scheme
+    varying = attributes.groupby(key, sort=False).nunique(dropna=False).max()
+    constant = [col for col in first.columns if col == key or varying.get(col, 0) <= 1]
+    schemes = _categorize(first[constant].set_index(key).sort_index())
+    return facts, schemes
+
+
+# Narrowest dtypes for a wide NAV frame: repeated strings as categoricals, scheme_code as int32
+# when it has no gaps, Close as nav_dtype. Returns a new frame.
+def compact_frame(df, nav_dtype='float64'):
+    df = df.copy()
+    if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    if 'Close' in df.columns:
+        df['Close'] = pd.to_numeric(df['Close'], errors='coerce').astype(nav_dtype)
+    if KEY in df.columns:
+        codes = pd.to_numeric(df[KEY], errors='coerce')
+        if codes.notna().all() and codes.abs().max() < 2 ** 31:
+            df[KEY] = codes.astype('int32')
+    return _categorize(df)
+
+
+# Deep memory use per column of each named frame, largest first, each table followed by its total
+def memory_report(frames):
+    tables = []
+    for name, frame in frames.items():
+        usage = frame.memory_usage(index=True, deep=True)
+        rows = pd.DataFrame({
+            'table': name,
+            'column': usage.index,
+            'dtype': [str(frame.index.dtype if col == 'Index' else frame[col].dtype) for col in usage.index],
+            'MB': usage.to_numpy() / 2 ** 20,
+        }).sort_values('MB', ascending=False, kind='stable')
+        total = pd.DataFrame({'table': [name], 'column': ['TOTAL'], 'dtype': [''], 'MB': [rows['MB'].sum()]})
+        tables.extend([rows, total])
+    return pd.concat(tables, ignore_index=True)
+
+
+def format_memory_report(report):
+    return report.to_string(index=False, formatters={'MB': '{:,.2f}'.format})
@@ -0,0 +1,175 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dataset import read_table, is_dataset
+from nav_layout import compact_frame, KEY
+from partition import partition_funds
+from profiler import stage
+
+# Out-of-core input for Final.py --memory-budget. Instead of loading the whole NAV history,
+# the input is cut into fund-aligned buckets (a fund is never split) small enough to analyse
+# within the budget, and Final.py runs the fund pool bucket by bucket, streaming results out.
+#   - pass 1 reads only the Fund (and scheme_code) column to count every fund's rows and
+#     packs funds into buckets, in input order, up to the budget's row limit;
+#   - a dataset input (see dataset.py) is then read bucket by bucket with a Fund filter;
+#   - a CSV is streamed once more in blocks and every row is spilled to its bucket's Parquet
+#     file in a scratch directory next to the output, since a CSV cannot be read by fund.
+# Each bucket is loaded with the benchmark's rows added, so every fund is measured against the
+# full benchmark series; the benchmark itself is analysed once, with the first bucket.
+# A fund bigger than the budget gets a bucket of its own.
+
+# Peak memory growth per bucket row while a bucket is loaded, compacted and analysed (measured
+# as RSS above the imported interpreter on synthetic data), used to turn the budget into a row limit
+BYTES_PER_ROW = 400
+# The CSV passes read blocks of a quarter of the bucket row limit: grouping a block by bucket
+# and converting it to Arrow peaks at about three times a bucket row per block row
+CSV_BLOCK_FRACTION = 4
+SPILL_SUFFIX = '.spill'
+SPILL_SCHEMA = {
+    'Fund': pa.string(),
+    'Date': pa.timestamp('ns'),
+    'Close': pa.float64(),
+    'scheme_category': pa.string(),
+    KEY: pa.float64(),
+    'Category': pa.string(),
+    'fund_house': pa.string(),
+}
+SPILL_STRINGS = [col for col, dtype in SPILL_SCHEMA.items() if dtype == pa.string()]
+
+
+def budget_rows(memory_budget_mb):
+    return max(int(memory_budget_mb * 2 ** 20 / BYTES_PER_ROW), 1)
+
+
+# Row count per fund in input order, and whether every row has a scheme_code
+def count_fund_rows(path, block_rows):
+    if is_dataset(path):
+        df = read_table(path, columns=['Fund', KEY])
+        counts = df['Fund'].astype(object).value_counts(sort=False)
+        codes_complete = KEY not in df.columns or bool(df[KEY].notna().all())
+        return counts, codes_complete
+    counts = {}
+    codes_complete = True
+    for block in pd.read_csv(path, usecols=lambda col: col in ('Fund', KEY), chunksize=block_rows):
+        for Fund, n in block['Fund'].value_counts(sort=False).items():
+            counts[Fund] = counts.get(Fund, 0) + n
+        if KEY in block.columns:
+            codes_complete &= bool(pd.to_numeric(block[KEY], errors='coerce').notna().all())
+    return pd.Series(counts, dtype='int64'), codes_complete
+
+
+# Greedy packing of funds into buckets of at most max_rows rows (the benchmark excluded)
+def plan_buckets(counts, max_rows, benchmark='Nifty 50'):
+    buckets, current, rows = [], [], 0
+    for Fund, n in counts.items():
+        if Fund == benchmark:
+            continue
+        if current and rows + n > max_rows:
+            buckets.append(current)
+            current, rows = [], 0
+        current.append(Fund)
+        rows += n
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def _spill_table(block):
+    columns = {}
+    for col, dtype in SPILL_SCHEMA.items():
+        values = block[col] if col in block.columns else pd.Series(None, index=block.index, dtype=object)
+        if col == 'Date':
+            values = pd.to_datetime(values, errors='coerce')
+        elif pa.types.is_floating(dtype):
+            values = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            values = values.astype('string')
+        columns[col] = pa.array(values, type=dtype, from_pandas=True)
+    return pa.table(columns)
+
+
+# Streams the CSV once, writing every row to the Parquet file of its bucket ('benchmark' for
+# the benchmark's rows); returns {bucket: path}
+def spill_csv(path, buckets, spill_dir, block_rows, benchmark='Nifty 50'):
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    os.makedirs(spill_dir)
+    bucket_of = {Fund: i for i, funds in enumerate(buckets) for Fund in funds}
+    bucket_of[benchmark] = 'benchmark'
+    paths = {bucket: os.path.join(spill_dir, f"bucket-{bucket}.parquet") for bucket in [*range(len(buckets)), 'benchmark']}
+    writers = {}
+    try:
+        for block in pd.read_csv(path, usecols=lambda col: col in SPILL_SCHEMA, chunksize=block_rows):
+            block = block[block['Fund'].notna()]
+            for bucket, rows in block.groupby(block['Fund'].map(bucket_of), sort=False):
+                table = _spill_table(rows)
+                if bucket not in writers:
+                    writers[bucket] = pq.ParquetWriter(paths[bucket], table.schema)
+                writers[bucket].write_table(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {bucket: path for bucket, path in paths.items() if bucket in writers}
+
+
+class FundBuckets:
+    def __init__(self, path, memory_budget_mb, benchmark='Nifty 50', spill_dir=None, columns=None):
+        self.path = path
+        self.max_rows = budget_rows(memory_budget_mb)
+        self.block_rows = max(self.max_rows // CSV_BLOCK_FRACTION, 1)
+        self.benchmark = benchmark
+        self.spill_dir = spill_dir
+        self.columns = columns
+        with stage('count_fund_rows'):
+            self.counts, self.codes_complete = count_fund_rows(path, self.block_rows)
+        self.buckets = plan_buckets(self.counts, self.max_rows, benchmark)
+        if not self.buckets and benchmark in self.counts.index:
+            self.buckets = [[]]  # only the benchmark: it still gets its own rows
+        self.funds = ([benchmark] if benchmark in self.counts.index else []) + [Fund for funds in self.buckets for Fund in funds]
+        self.oversized = [Fund for Fund, n in self.counts.items() if n > self.max_rows]
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def _load(self, bucket, files):
+        if files is None:
+            funds = self.buckets[bucket] + [self.benchmark]
+            return read_table(self.path, columns=self.columns, filters=[('Fund', 'in', funds)])
+        # Strings come back dictionary-encoded, i.e. as categoricals, never as Python objects
+        tables = [pq.read_table(files[key], read_dictionary=SPILL_STRINGS) for key in (bucket, 'benchmark') if key in files]
+        return pa.concat_tables(tables).to_pandas()
+
+    # Yields (df, fund_slices, funds to analyse) per bucket, partitioned as Final.load_funds does
+    def __iter__(self):
+        files = None
+        if not is_dataset(self.path):
+            with stage('spill_csv'):
+                files = spill_csv(self.path, self.buckets, self.spill_dir, self.block_rows, self.benchmark)
+        try:
+            for bucket, funds in enumerate(self.buckets):
+                with stage('load_bucket', rows=int(self.counts[funds].sum())):
+                    df = compact_frame(self._load(bucket, files))
+                    if not self.codes_complete and KEY in df.columns:
+                        # Same scheme_code dtype in every bucket as a full load would give
+                        df[KEY] = df[KEY].astype('float64')
+                    df, fund_slices = partition_funds(df)
+                yield df, fund_slices, ([self.benchmark] if bucket == 0 and self.benchmark in fund_slices else []) + funds
+                del df, fund_slices
+        finally:
+            if files is not None:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def spill_path(output):
+    return output.rstrip('/\\') + SPILL_SUFFIX
+
+
+def describe(buckets):
+    sizes = np.array([buckets.counts[funds].sum() for funds in buckets.buckets])
+    text = (f"Out-of-core: {len(buckets.funds)} funds in {len(buckets)} buckets of up to {buckets.max_rows:,} rows "
+            f"(largest {sizes.max() if len(sizes) else 0:,})")
+    if buckets.oversized:
+        text += f"; {len(buckets.oversized)} funds exceed the budget on their own"
+    return text
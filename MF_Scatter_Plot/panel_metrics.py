@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+from window_engine import iter_windows, date_ranges
+from metrics import drawdown_kernel
+from profiler import stage
+
+# Cross-sectional ("panel") version of calculate_risk_metrics. Every fund's window series is
+# laid out as one column of a dates x funds matrix (NaN where a fund has no NAV), and every
+# metric in metrics.py is computed for all columns at once with masked NumPy reductions.
+# Definitions, scaling and rounding follow calculate_risk_metrics exactly, including its quirks
+# (ddof=0 for the Sharpe denominator, sqrt(12) for the Sortino downside deviation at any
+# frequency, Calmar measured on the rows that have a return).
+
+ANNUAL_RATES = {'daily': 252, 'weekly': 52, 'monthly': 12}
+
+RESULT_COLUMNS = [
+    'Fund', 'Category_Name', 'Scheme_code', 'Category', 'Fund_house', 'timeline', 'CAGR',
+    'sharpe_ratio', 'sortino_ratio', 'std', 'treynor_ratio', 'beta_value', 'alpha', 'r_squared',
+    'omega', 'calmar', 'downside_capture', 'upside_capture', 'Maximum_Drawdown', 'Peak_Date',
+    'Trough_Date', 'Recovery_Time', 'Recovery_Date', 'result_type',
+]
+
+
+def _divide(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), np.nan)
+
+
+def masked_sum(values, mask):
+    return np.where(mask, values, 0.0).sum(axis=0)
+
+
+def masked_mean(values, mask):
+    return _divide(masked_sum(values, mask), mask.sum(axis=0).astype(float)) * np.where(mask.any(axis=0), 1, np.nan)
+
+
+def masked_std(values, mask, ddof=1):
+    n = mask.sum(axis=0)
+    mean = masked_mean(values, mask)
+    squares = masked_sum((values - mean) ** 2, mask)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n > ddof, np.sqrt(squares / np.maximum(n - ddof, 1)), np.nan)
+
+
+def first_true(mask):
+    idx = mask.argmax(axis=0)
+    return np.where(mask.any(axis=0), idx, -1)
+
+
+def last_true(mask):
+    idx = mask.shape[0] - 1 - mask[::-1].argmax(axis=0)
+    return np.where(mask.any(axis=0), idx, -1)
+
+
+def _take(matrix, idx):
+    cols = np.arange(matrix.shape[1])
+    return np.where(idx >= 0, matrix[np.maximum(idx, 0), cols], np.nan)
+
+
+def _dates_at(dates, idx):
+    return np.where(idx >= 0, dates[np.maximum(idx, 0)], np.datetime64('NaT'))
+
+
+# Slope, intercept and R^2 of returns on market returns per column, as scipy.stats.linregress
+def panel_regression(returns, market_returns, mask):
+    n = mask.sum(axis=0)
+    x_bad = (mask & np.isnan(market_returns)).any(axis=0)
+    xm = masked_mean(market_returns, mask)
+    ym = masked_mean(returns, mask)
+    dx = np.where(mask, market_returns - xm, 0.0)
+    dy = np.where(mask, returns - ym, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ssxm = (dx * dx).sum(axis=0) / n
+        ssym = (dy * dy).sum(axis=0) / n
+        ssxym = (dx * dy).sum(axis=0) / n
+        r = np.where((ssxm == 0) | (ssym == 0), np.where(ssxym == 0, np.nan, 0.0),
+                     ssxym / np.sqrt(ssxm * ssym))
+        slope = ssxym / ssxm
+    r = np.clip(r, -1.0, 1.0)
+    intercept = ym - slope * xm
+    # linregress raises for identical x values, which calculate_beta_alpha_r2 turns into NaN
+    invalid = x_bad | (n == 0) | ((ssxm == 0) & (n > 1))
+    return (np.where(invalid, np.nan, slope), np.where(invalid, np.nan, intercept),
+            np.where(invalid, np.nan, r ** 2))
+
+
+# The benchmark-relative metrics of calculate_risk_metrics (beta, alpha, R^2, Treynor and the
+# capture ratios), rounded the same way, for every column of returns against the same column
+# of market_returns. Columns can be funds (one benchmark) or benchmarks (one fund, see
+# multi_benchmark.py).
+def relative_metrics(returns, market_returns, mask, annual_rate, risk_free_rate=0.06):
+    mean_excess = masked_mean(returns - risk_free_rate / annual_rate, mask)
+    with stage('linregress'):
+        beta, intercept, r_squared = panel_regression(returns, market_returns, mask)
+    treynor = _divide(mean_excess * annual_rate, beta)
+    down = mask & (market_returns < 0)
+    up = mask & (market_returns > 0)
+    downside_capture = _divide(masked_mean(returns, down), masked_mean(market_returns, down))
+    upside_capture = _divide(masked_mean(returns, up), masked_mean(market_returns, up))
+    return {
+        'treynor_ratio': np.round(treynor * 100, 2),
+        'beta_value': np.round(beta * 100, 2),
+        'alpha': intercept * annual_rate * 100,
+        'r_squared': r_squared,
+        'downside_capture': np.round(downside_capture * 100, 0),
+        'upside_capture': np.round(upside_capture * 100, 0),
+    }
+
+
+# Same metrics as calculate_risk_metrics for every column of a dates x funds panel.
+# returns must be NaN on each fund's first row, as pct_change leaves it; market_returns can be
+# a (dates,) vector or a full matrix. Returns a dict of per-fund arrays plus a 'valid' flag
+# (False where calculate_risk_metrics would return None).
+def panel_risk_metrics(dates, close, returns, market_returns, freq='monthly', risk_free_rate=0.06):
+    if freq not in ANNUAL_RATES:
+        raise ValueError("Frequency must be 'daily', 'weekly', or 'monthly'.")
+    annual_rate = ANNUAL_RATES[freq]
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    close = np.asarray(close, dtype=float)
+    returns = np.asarray(returns, dtype=float)
+    market_returns = np.broadcast_to(np.asarray(market_returns, dtype=float).reshape(len(dates), -1), close.shape)
+
+    close_mask = ~np.isnan(close)
+    first = first_true(close_mask)
+    last = last_true(close_mask)
+    days = (_dates_at(dates, last) - _dates_at(dates, first)) / np.timedelta64(1, 'D')
+    years = np.array([1 if not d > 365.25 else round(d / 365.25, 1) for d in days], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = ((_take(close, last) / _take(close, first)) ** (1 / years) - 1) * 100
+
+    with stage('drawdown'):
+        drawdown = drawdown_kernel(close, close_mask)
+    max_dd, peak_idx, trough_idx, recovery_idx = (drawdown[key] for key in ('max_drawdown', 'peak', 'trough', 'recovery'))
+    recovery_days = (_dates_at(dates, recovery_idx) - _dates_at(dates, trough_idx)) / np.timedelta64(1, 'D')
+
+    mask = close_mask & ~np.isnan(returns)
+    excess = returns - risk_free_rate / annual_rate
+    mean_excess = masked_mean(excess, mask)
+    stdev = masked_std(returns, mask) * np.sqrt(annual_rate)
+    sharpe = _divide(mean_excess * annual_rate, masked_std(excess, mask, ddof=0) * np.sqrt(annual_rate))
+    mean_return = masked_mean(returns, mask)
+    downside = masked_std(returns, mask & (returns < mean_return)) * np.sqrt(12)
+    sortino = _divide(mean_excess * annual_rate, downside)
+    relative = relative_metrics(returns, market_returns, mask, annual_rate, risk_free_rate)
+    omega = _divide(masked_sum(returns, mask & (returns > 0)), -masked_sum(returns, mask & (returns < 0)))
+    calmar_dd = drawdown_kernel(close, mask)['max_drawdown']
+    calmar = _divide(mean_return * annual_rate, calmar_dd)
+
+    return {
+        'valid': mask.any(axis=0),
+        'CAGR': cagr,
+        'sharpe_ratio': np.round(sharpe, 2),
+        'sortino_ratio': np.round(sortino, 2),
+        'std': np.round(stdev * 100, 2),
+        'treynor_ratio': relative['treynor_ratio'],
+        'beta_value': relative['beta_value'],
+        'alpha': relative['alpha'],
+        'r_squared': relative['r_squared'],
+        'omega': omega,
+        'calmar': calmar,
+        'downside_capture': relative['downside_capture'],
+        'upside_capture': relative['upside_capture'],
+        'Maximum_Drawdown': max_dd * 100,
+        'Peak_Date': _dates_at(dates, peak_idx),
+        'Trough_Date': _dates_at(dates, trough_idx),
+        'Recovery_Time': np.where(recovery_idx >= 0, recovery_days, np.nan),
+        'Recovery_Date': _dates_at(dates, recovery_idx),
+    }
+
+
+# Stacks per-fund window series (labels, close, returns, market_returns) onto a shared date grid
+def build_panel(windows):
+    grid = np.unique(np.concatenate([labels for labels, _, _, _ in windows]))
+    shape = (len(grid), len(windows))
+    close = np.full(shape, np.nan)
+    returns = np.full(shape, np.nan)
+    market = np.full(shape, np.nan)
+    for j, (labels, c, r, m) in enumerate(windows):
+        rows = np.searchsorted(grid, labels)
+        close[rows, j] = c
+        returns[rows, j] = r
+        market[rows, j] = m
+    return grid, close, returns, market
+
+
+# Panel counterpart of running analyse_fund over many funds: each timeline is one panel across
+# all funds, so per-window Python work is limited to slicing. Returns one frame of result rows.
+# timelines, if given, holds one timeline subset (or None for all) per fund.
+def analyse_funds_panel(funds, market, metas, risk_free_rate=0.06, result_type='default', max_dates=None,
+                        timelines=None):
+    from Fund_Analysis import analysis_end_date
+
+    by_timeline = {}
+    for i, fund in enumerate(funds):
+        if len(fund) == 0:
+            continue
+        max_date = max_dates[i] if max_dates is not None else analysis_end_date(pd.Timestamp(fund.dates[-1]), result_type)
+        with stage('panel_windows', metas[i].get('Fund'), result_type=result_type):
+            for timeline, freq, *aligned in iter_windows(fund, market, max_date, timelines[i] if timelines else None):
+                by_timeline.setdefault(timeline, (freq, [], []))
+                by_timeline[timeline][1].append(i)
+                by_timeline[timeline][2].append(aligned)
+
+    frames = []
+    timeline_order = {timeline: k for k, timeline in enumerate(date_ranges(pd.Timestamp('2000-01-31')))}
+    for timeline, (freq, fund_idx, windows) in by_timeline.items():
+        with stage('build_panel', timeline=timeline, funds=len(windows)):
+            grid, close, returns, market_returns = build_panel(windows)
+        with stage('panel_risk_metrics', timeline=timeline, funds=len(windows)):
+            metrics = panel_risk_metrics(grid, close, returns, market_returns, freq, risk_free_rate)
+        valid = metrics.pop('valid')
+        fund_idx = np.asarray(fund_idx)[valid]
+        frame = pd.DataFrame({
+            'Fund': [metas[i].get('Fund') for i in fund_idx],
+            'Category_Name': [metas[i].get('scheme_category') for i in fund_idx],
+            'Scheme_code': [metas[i].get('scheme_code') for i in fund_idx],
+            'Category': [metas[i].get('Category') for i in fund_idx],
+            'Fund_house': [metas[i].get('fund_house') for i in fund_idx],
+            'timeline': timeline,
+            **{key: values[valid] for key, values in metrics.items()},
+            'result_type': result_type,
+        })
+        frame['_fund'] = fund_idx
+        frame['_order'] = timeline_order[timeline]
+        frames.append(frame)
+
+    if not frames:
+        return None
+    results = pd.concat(frames, ignore_index=True).sort_values(['_fund', '_order'], kind='stable')
+    return results.drop(columns=['_fund', '_order']).reset_index(drop=True)[RESULT_COLUMNS]
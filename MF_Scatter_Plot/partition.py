@@ -0,0 +1,18 @@
+import numpy as np
+
+# Partitions the combined NAV frame once: rows are sorted by (Fund, Date) so every fund is a
+# contiguous block, and each fund maps to its (start, stop) row offsets. A fund's rows are then
+# df.iloc[start:stop], a slice view instead of a df[df['Fund'] == Fund] scan over every row.
+
+def partition_funds(df, key='Fund', date_col='Date'):
+    df = df.dropna(subset=[key])
+    sort_cols = [key, date_col] if date_col in df.columns else [key]
+    df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+    values = df[key].to_numpy()
+    if len(values) == 0:
+        return df, {}
+    change = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate(([0], change))
+    stops = np.concatenate((change, [len(values)]))
+    slices = {values[start]: (int(start), int(stop)) for start, stop in zip(starts, stops)}
+    return df, slices
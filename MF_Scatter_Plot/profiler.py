@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import threading
+import contextlib
+import numpy as np
+import pandas as pd
+
+# Stage-level instrumentation for the Final.py pipeline. Code marks its stages with
+#   with stage('calculate_risk_metrics', Fund, timeline=timeline): ...
+# While profiling is off (the default) stage() returns a shared no-op context, so the marks
+# cost one global lookup. Final.py --profile turns it on and, at the end of the run, writes
+#   <output>.profile.json  per-stage call counts, wall and CPU time, and per-fund outliers
+#   <output>.trace.json    every stage call as a Chrome trace event (chrome://tracing, Perfetto)
+# Stage times are inclusive: a stage's time includes the stages nested in it. Worker processes
+# profile themselves and send their records back with each chunk (see fund_pool.py).
+
+PROFILE_SUFFIX = '.profile.json'
+TRACE_SUFFIX = '.trace.json'
+# Trace events kept in memory; later calls are still counted in the summary
+MAX_EVENTS = 500000
+# A fund is an outlier in a stage when its time there is this many times the median fund's
+OUTLIER_FACTOR = 5
+TOP_FUNDS = 10
+
+_active = None
+_NULL = contextlib.nullcontext()
+
+
+def profile_paths(output):
+    output = output.rstrip('/\\')
+    return output + PROFILE_SUFFIX, output + TRACE_SUFFIX
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'fund', 'args', 'wall', 'cpu', 'ts')
+
+    def __init__(self, profiler, name, fund, args):
+        self.profiler = profiler
+        self.name = name
+        self.fund = fund
+        self.args = args
+
+    def __enter__(self):
+        self.ts = time.time_ns() // 1000
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        self.profiler.add(self.name, self.fund, self.args, self.ts, wall, cpu)
+
+
+class Profiler:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.max_events = max_events
+        self.stages = {}     # name -> [calls, wall, cpu, max wall]
+        self.fund_times = {}  # name -> {Fund: wall}
+        self.events = []
+        self.dropped = 0
+        self.processes = {os.getpid(): 'driver'}
+        self._lock = threading.Lock()
+
+    def stage(self, name, fund=None, **args):
+        return _Stage(self, name, fund, args)
+
+    def add(self, name, fund, args, ts, wall, cpu):
+        with self._lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = [0, 0.0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] = max(totals[3], wall)
+            if fund is not None:
+                funds = self.fund_times.setdefault(name, {})
+                funds[fund] = funds.get(fund, 0.0) + wall
+            if len(self.events) < self.max_events:
+                event_args = dict(args, fund=fund) if fund is not None else args
+                self.events.append({'name': name, 'ph': 'X', 'ts': ts, 'dur': round(wall * 1e6, 1),
+                                    'pid': os.getpid(), 'tid': threading.get_native_id(), 'args': event_args})
+            else:
+                self.dropped += 1
+
+    # Everything recorded so far, handed over and forgotten (used by worker processes)
+    def drain(self):
+        with self._lock:
+            records = {'stages': self.stages, 'fund_times': self.fund_times, 'events': self.events,
+                       'dropped': self.dropped, 'pid': os.getpid()}
+            self.stages, self.fund_times, self.events, self.dropped = {}, {}, [], 0
+        return records
+
+    def merge(self, records):
+        with self._lock:
+            for name, (calls, wall, cpu, max_wall) in records['stages'].items():
+                totals = self.stages.setdefault(name, [0, 0.0, 0.0, 0.0])
+                totals[0] += calls
+                totals[1] += wall
+                totals[2] += cpu
+                totals[3] = max(totals[3], max_wall)
+            for name, funds in records['fund_times'].items():
+                mine = self.fund_times.setdefault(name, {})
+                for fund, wall in funds.items():
+                    mine[fund] = mine.get(fund, 0.0) + wall
+            room = max(self.max_events - len(self.events), 0)
+            self.events.extend(records['events'][:room])
+            self.dropped += records['dropped'] + max(len(records['events']) - room, 0)
+            self.processes.setdefault(records['pid'], f"worker {len(self.processes)}")
+
+    def outliers(self, top=TOP_FUNDS, factor=OUTLIER_FACTOR):
+        outliers = {}
+        for name, funds in self.fund_times.items():
+            if len(funds) < 2:
+                continue
+            times = pd.Series(funds)
+            median = times.median()
+            slow = times[times > factor * median].nlargest(top)
+            if not slow.empty:
+                outliers[name] = [{'fund': fund, 'wall_ms': wall * 1000, 'x_median': wall / median}
+                                  for fund, wall in slow.items()]
+        return outliers
+
+    def summary(self):
+        stages = {}
+        for name, (calls, wall, cpu, max_wall) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            funds = self.fund_times.get(name, {})
+            stages[name] = {
+                'calls': calls,
+                'wall_s': wall,
+                'cpu_s': cpu,
+                'mean_ms': wall / calls * 1000,
+                'max_ms': max_wall * 1000,
+                'funds': len(funds),
+                'median_fund_ms': float(np.median(list(funds.values()))) * 1000 if funds else None,
+            }
+        return {'stages': stages, 'outliers': self.outliers(), 'trace_events': len(self.events),
+                'trace_events_dropped': self.dropped, 'processes': len(self.processes)}
+
+    def chrome_trace(self):
+        names = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}}
+                 for pid, name in self.processes.items()]
+        return {'traceEvents': names + self.events, 'displayTimeUnit': 'ms'}
+
+    def write(self, summary_path, trace_path):
+        for path, content in ((summary_path, self.summary()), (trace_path, self.chrome_trace())):
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(content, f, indent=None if path == trace_path else 1, default=str)
+            os.replace(tmp_path, path)
+
+
+def enable(max_events=MAX_EVENTS):
+    global _active
+    _active = Profiler(max_events)
+    return _active
+
+
+def disable():
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def is_enabled():
+    return _active is not None
+
+
+def active():
+    return _active
+
+
+def stage(name, fund=None, **args):
+    if _active is None:
+        return _NULL
+    return _active.stage(name, fund, **args)
+
+
+def format_summary(summary, top=15):
+    rows = [{'stage': name, **{key: values[key] for key in ('calls', 'wall_s', 'cpu_s', 'mean_ms', 'max_ms')}}
+            for name, values in list(summary['stages'].items())[:top]]
+    if not rows:
+        return "No stages recorded"
+    text = pd.DataFrame(rows).to_string(index=False, float_format='{:,.3f}'.format)
+    for name, funds in summary['outliers'].items():
+        slowest = funds[0]
+        text += (f"\n{name}: {len(funds)} outlier fund(s), slowest {slowest['fund']} "
+                 f"{slowest['wall_ms']:,.1f} ms ({slowest['x_median']:.1f}x median)")
+    return text
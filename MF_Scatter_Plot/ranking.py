@@ -0,0 +1,125 @@
+import argparse
+import numpy as np
+import pandas as pd
+from dataset import read_table, write_dataset, PARTITIONS
+from result_sink import read_results, replace_results, DEFAULT_BATCH_ROWS
+
+# Peer ranking stage run after Final.py: every metric of final_data is ranked within its peer
+# group (Category_Name, timeline, result_type) with one vectorized groupby-rank per direction.
+# For each metric the ranks table holds
+#   <metric>_pct       percentile in the peer group, 100 for the best fund, 100/n for the worst
+#   <metric>_quartile  1 (top 25%) .. 4 (bottom 25%)
+# next to the row keys and the peer count, one row per final_data row. "Best" follows the
+# metric's direction: higher CAGR, Sharpe, ... are better; lower volatility, drawdown, downside
+# capture and recovery time are better. Beta and R^2 have no better side, so they only get
+#   <metric>_pctile    where the value sits in the peer group, 100 for the highest
+# with no quartile, and top_funds() does not screen on them.
+# Funds with no value for a metric get no rank for it, except Recovery_Time: there no value
+# means the fund has not recovered from its drawdown, so those funds tie for last. The table
+# is written next to the output (final_data_ranks.csv, or <dir>_ranks for a Parquet output);
+# top_funds() answers queries such as the top decile of 3Y Sortino in a category.
+
+GROUP_KEYS = ['Category_Name', 'timeline', 'result_type']
+ROW_KEYS = ['Fund', 'Category_Name', 'timeline', 'result_type']
+HIGHER_IS_BETTER = ['CAGR', 'sharpe_ratio', 'sortino_ratio', 'treynor_ratio', 'alpha', 'omega', 'calmar',
+                    'upside_capture']
+LOWER_IS_BETTER = ['std', 'downside_capture', 'Maximum_Drawdown', 'Recovery_Time']
+NO_BETTER_SIDE = ['beta_value', 'r_squared']
+# NaN means "not recovered yet", the worst value, wherever the fund has a drawdown
+UNRECOVERED_LAST = {'Recovery_Time': 'Maximum_Drawdown'}
+RANK_METRICS = HIGHER_IS_BETTER + LOWER_IS_BETTER + NO_BETTER_SIDE
+RANKS_SUFFIX = '_ranks'
+
+
+def ranks_path(output):
+    if output.lower().endswith('.csv'):
+        return output[:-4] + RANKS_SUFFIX + '.csv'
+    return output.rstrip('/\\') + RANKS_SUFFIX
+
+
+def rank_metrics(results, metrics=None):
+    metrics = [col for col in (metrics or RANK_METRICS) if col in results.columns]
+    results = results.reset_index(drop=True)
+    values = results[metrics].apply(pd.to_numeric, errors='coerce')
+    for col, measured in UNRECOVERED_LAST.items():
+        if col in metrics:
+            has_value = results[measured].notna() if measured in results.columns else True
+            values[col] = values[col].mask(values[col].isna() & has_value, np.inf)
+    keys = [results[col] for col in GROUP_KEYS]
+    groups = values.groupby(keys, sort=False, dropna=False)
+
+    # Rank 1 is the best fund of its group, whichever direction the metric runs; metrics with no
+    # better side rank high-to-low only to place the value, and get no quartile below
+    higher = [col for col in metrics if col not in LOWER_IS_BETTER]
+    lower = [col for col in metrics if col in LOWER_IS_BETTER]
+    rank = pd.concat([groups[higher].rank(ascending=False, method='average'),
+                      groups[lower].rank(ascending=True, method='average')], axis=1)[metrics]
+    count = groups[metrics].transform('count')
+
+    ranks = results[ROW_KEYS].copy()
+    ranks['peers'] = pd.array(results.groupby(keys, sort=False, dropna=False)['Fund'].transform('size'), dtype='Int32')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = 100 * (count - rank + 1) / count
+        quartile = np.ceil(rank / count * 4).clip(1, 4)
+    for col in metrics:
+        if col in NO_BETTER_SIDE:
+            ranks[col + '_pctile'] = pct[col].round(2)
+            continue
+        ranks[col + '_pct'] = pct[col].round(2)
+        ranks[col + '_quartile'] = quartile[col].astype('Int8')
+    return ranks
+
+
+def write_ranks(ranks, path, batch_rows=DEFAULT_BATCH_ROWS):
+    if path.lower().endswith('.csv'):
+        replace_results(path, ranks, batch_rows)
+    else:
+        write_dataset(ranks, path, PARTITIONS['metrics'])
+    return path
+
+
+# Ranks final_data at output and stores them at ranks_path(output); returns the ranks path
+def rank_results(output, batch_rows=DEFAULT_BATCH_ROWS):
+    results = read_results(output)
+    if results is None or results.empty:
+        return None
+    return write_ranks(rank_metrics(results), ranks_path(output), batch_rows)
+
+
+# The ranks table, or the rows and columns of it a screen needs (CSV or dataset)
+def read_ranks(path, columns=None, filters=None):
+    return read_table(path, columns, filters, categories=False)
+
+
+# Funds at or above a percentile for one metric, e.g. top_funds(ranks, 'sortino_ratio', '3Y',
+# 'Equity Scheme - Flexi Cap Fund', percentile=90) for the top decile; best first
+def top_funds(ranks, metric, timeline, category=None, result_type='default', percentile=90):
+    if metric in NO_BETTER_SIDE:
+        raise ValueError(f"{metric} has no better side to screen on")
+    selected = ranks[(ranks['timeline'] == timeline) & (ranks['result_type'] == result_type)
+                     & (ranks[metric + '_pct'] >= percentile)]
+    if category is not None:
+        selected = selected[selected['Category_Name'] == category]
+    return selected.sort_values(metric + '_pct', ascending=False, kind='stable')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rank every metric of final_data within its category.")
+    parser.add_argument('results', help="final_data.csv or the Parquet output directory of Final.py")
+    parser.add_argument('--output', default=None, help="ranks table to write (default: next to the results)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = read_results(args.results)
+    if results is None:
+        print(f"No results in {args.results}")
+        return
+    ranks = rank_metrics(results)
+    path = write_ranks(ranks, args.output or ranks_path(args.results))
+    print(f"Wrote ranks for {len(ranks)} rows in {ranks.groupby(GROUP_KEYS).ngroups} peer groups to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import os
+import abc
+import glob
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from profiler import stage
+
+# Streaming result sinks for the Final.py collector. Each finished chunk of metrics rows is
+# buffered and flushed to disk in batches, so memory stays flat and everything flushed so far
+# survives a crash. The output format follows the path:
+#   *.csv          -> one CSV, appended batch by batch (header written once)
+#   anything else  -> a directory of Parquet part files, one per flushed batch
+#                     (each part is complete on its own, unlike one file whose footer is
+#                      only written on close); read back with pd.read_parquet(path)
+# Every batch is cast to the same column types before it is written (see normalize_results), so
+# a batch in which a metric happens to be all-NaN still gives a Parquet part the schema of the
+# others and the parts read back as one table.
+
+DEFAULT_BATCH_ROWS = 5000
+DATE_COLUMNS = ['Date', 'Peak_Date', 'Trough_Date', 'Recovery_Date']
+CODE_COLUMNS = ['Scheme_code', 'scheme_code']
+STRING_COLUMNS = ['Fund', 'Category_Name', 'Category', 'Fund_house', 'scheme_category', 'timeline',
+                  'window', 'Benchmark', 'result_type']
+
+
+def _is_text(values):
+    return values.dtype == object and values.map(lambda value: isinstance(value, str)).any()
+
+
+# Gives every batch the same dtypes, whatever mix of None/NaT/values a chunk happened to hold:
+# dates as datetime64, scheme codes as nullable Int64, names as strings (None when missing),
+# nullable integer columns (e.g. rank quartiles) as they are, and every other column as float64
+def normalize_results(df):
+    df = df.copy()
+    for col in df.columns:
+        values = df[col]
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(values, errors='coerce')
+        elif col in CODE_COLUMNS:
+            df[col] = pd.to_numeric(values, errors='coerce').astype('Int64')
+        elif col in STRING_COLUMNS or _is_text(values):
+            values = values.astype(object)
+            df[col] = values.where(values.notna(), None)
+        elif not (pd.api.types.is_extension_array_dtype(values.dtype) and pd.api.types.is_integer_dtype(values.dtype)):
+            df[col] = pd.to_numeric(values, errors='coerce').astype('float64')
+    return df
+
+
+# Arrow schema of a normalized batch; spelled out so that all-null columns keep their type
+def results_schema(df):
+    fields = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            arrow_type = pa.timestamp('ns')
+        elif pd.api.types.is_extension_array_dtype(dtype) and pd.api.types.is_integer_dtype(dtype):
+            arrow_type = pa.from_numpy_dtype(dtype.numpy_dtype)
+        elif dtype == object:
+            arrow_type = pa.string()
+        else:
+            arrow_type = pa.from_numpy_dtype(dtype)
+        fields.append(pa.field(col, arrow_type))
+    return pa.schema(fields)
+
+
+class ResultSink(abc.ABC):
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._buffer = []
+        self._buffered = 0
+        # Called after every batch reaches disk; lets a run checkpoint what is now durable
+        self.on_flush = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df):
+        if df is None or df.empty:
+            return
+        self._buffer.append(df)
+        self._buffered += len(df)
+        if self._buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        with stage('sink_flush', rows=self._buffered):
+            batch = normalize_results(pd.concat(self._buffer, ignore_index=True))
+            self._write_batch(batch)
+        self.rows += len(batch)
+        self._buffer = []
+        self._buffered = 0
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def close(self):
+        self.flush()
+
+    @abc.abstractmethod
+    def _write_batch(self, batch):
+        pass
+
+
+class CsvSink(ResultSink):
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS, append=False):
+        super().__init__(path, batch_rows)
+        self._header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        if not append and os.path.exists(path):
+            os.remove(path)
+
+    def _write_batch(self, batch):
+        with open(self.path, 'a', newline='') as f:
+            batch.to_csv(f, index=False, header=self._header)
+            f.flush()
+            os.fsync(f.fileno())
+        self._header = False
+
+
+class ParquetSink(ResultSink):
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS, append=False):
+        super().__init__(path, batch_rows)
+        os.makedirs(path, exist_ok=True)
+        existing = sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+        if not append:
+            for part in existing:
+                os.remove(part)
+            existing = []
+        self._part = len(existing)
+
+    def _write_batch(self, batch):
+        part_path = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+        tmp_path = part_path + '.tmp'
+        table = pa.Table.from_pandas(batch, schema=results_schema(batch), preserve_index=False)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, part_path)
+        self._part += 1
+
+
+def open_sink(path, batch_rows=DEFAULT_BATCH_ROWS, append=False):
+    if path.lower().endswith('.csv'):
+        return CsvSink(path, batch_rows, append)
+    return ParquetSink(path, batch_rows, append)
+
+
+# Everything written so far to a CSV file or Parquet part directory (None if nothing exists yet)
+def read_results(path):
+    if path.lower().endswith('.csv'):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        return normalize_results(pd.read_csv(path, float_precision='round_trip'))
+    parts = sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+    if not parts:
+        return None
+    return normalize_results(pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True))
+
+
+# Rewrites the whole output with df: written beside the target first, then swapped in, so a
+# crash leaves either the old or the new results, never a mix
+def replace_results(path, df, batch_rows=DEFAULT_BATCH_ROWS):
+    is_csv = path.lower().endswith('.csv')
+    base = path[:-4] if is_csv else path.rstrip('/\\')
+    tmp_path = base + ('.tmp.csv' if is_csv else '.tmp')
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    with open_sink(tmp_path, batch_rows) as sink:
+        sink.write(df)
+    if is_csv:
+        if sink.rows == 0:
+            df.head(0).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    else:
+        old_path = base + '.old'
+        if os.path.isdir(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    return sink.rows
@@ -0,0 +1,190 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from window_engine import simple_returns
+
+# Rolling analytics: for every bin of a fund's resampled NAV series, the CAGR, volatility, Sharpe,
+# beta and maximum drawdown of the trailing window (e.g. 3Y) ending at that bin. Windows slide
+# forward, so nothing is recomputed from scratch:
+#   - return statistics come from prefix (running) sums of r, r^2, m, m^2 and r*m, so each window
+#     is a handful of subtractions;
+#   - the window high (for the current drawdown) is kept in a monotonic deque;
+#   - the window's maximum drawdown uses a two-stack queue of (max, min, max drawdown) summaries,
+#     which merge associatively, so every window costs amortised O(1).
+# Windows follow the Fund_Analysis conventions: a window starts at the first bin on or after
+# end - window, its first bin only anchors returns, and a window is reported only when the fund
+# covers 95% of it.
+
+ANNUAL_RATES = {'daily': 252, 'weekly': 52, 'monthly': 12}
+ROLLING_WINDOWS = {
+    '1Y': pd.DateOffset(years=1),
+    '3Y': pd.DateOffset(years=3),
+    '5Y': pd.DateOffset(years=5),
+    '7Y': pd.DateOffset(years=7),
+    '10Y': pd.DateOffset(years=10),
+}
+MIN_COVERAGE = 0.95
+ROLLING_SUFFIX = '_rolling_'
+
+
+# Rolling series have their own schema, so they get their own table next to the metrics output
+# (final_data_rolling_3Y.csv, or <dir>_rolling_3Y for a Parquet output)
+def rolling_path(output, window):
+    if output.lower().endswith('.csv'):
+        return output[:-4] + ROLLING_SUFFIX + window + '.csv'
+    return output.rstrip('/\\') + ROLLING_SUFFIX + window
+
+
+def window_starts(labels, window):
+    starts = (pd.DatetimeIndex(labels) - ROLLING_WINDOWS[window]).to_numpy()
+    return np.searchsorted(labels, starts, 'left'), starts
+
+
+def _window_sums(values, lo, hi):
+    # Sum of values[lo + 1 .. hi] for every window, from one prefix-sum array
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    return prefix[hi + 1] - prefix[lo + 1]
+
+
+# Current drawdown from the window high, with the high tracked by a monotonic deque
+def rolling_drawdown(close, lo):
+    highs = deque()
+    drawdown = np.empty(len(close))
+    for i, value in enumerate(close):
+        while highs and close[highs[-1]] <= value:
+            highs.pop()
+        highs.append(i)
+        while highs[0] < lo[i]:
+            highs.popleft()
+        peak = close[highs[0]]
+        drawdown[i] = (peak - value) / peak
+    return drawdown
+
+
+def _merge(a, b):
+    # (max, min, max drawdown) of segment a followed by segment b
+    return max(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2], (a[0] - b[1]) / a[0])
+
+
+# Maximum drawdown of close[lo[i] .. i] for every i, via a two-stack sliding-window aggregate
+def rolling_max_drawdown(close, lo):
+    front = []      # suffix summaries of the oldest elements, newest-first so pop() is the oldest
+    back = None     # summary of everything pushed since the last transfer
+    back_items = []
+    start = 0
+    result = np.empty(len(close))
+    for i, value in enumerate(close):
+        item = (value, value, 0.0)
+        back = item if back is None else _merge(back, item)
+        back_items.append(value)
+        while start < lo[i]:
+            if not front:
+                # Move the back stack over, building suffix summaries from the newest element down
+                summary = None
+                for v in reversed(back_items):
+                    node = (v, v, 0.0)
+                    summary = node if summary is None else _merge(node, summary)
+                    front.append(summary)
+                back, back_items = None, []
+            front.pop()
+            start += 1
+        if front and back is not None:
+            result[i] = _merge(front[-1], back)[2]
+        else:
+            result[i] = (front[-1] if front else back)[2]
+    return result
+
+
+# Rolling metrics of one fund against the benchmark. fund is a SeriesArrays, market a
+# BenchmarkContext; returns a frame indexed by bin end date (metrics NaN until a full window).
+def rolling_metrics(fund, market, window='3Y', freq='daily', risk_free_rate=0.06):
+    if window not in ROLLING_WINDOWS:
+        raise ValueError(f"window must be one of {list(ROLLING_WINDOWS)}")
+    if freq not in ANNUAL_RATES:
+        raise ValueError("Frequency must be 'daily', 'weekly', or 'monthly'.")
+    if len(fund) == 0:
+        return None
+    annual_rate = ANNUAL_RATES[freq]
+    labels, close = fund.resampled(freq, 0, len(fund))
+    returns = simple_returns(close)
+
+    # Benchmark return of each fund bin: matched bin, 0 inside the benchmark range, NaN outside
+    m_labels, _, m_returns = market.resampled[freq]
+    market_returns = np.full(len(labels), np.nan)
+    if len(m_labels):
+        pos = np.minimum(np.searchsorted(m_labels, labels), len(m_labels) - 1)
+        inside = (labels >= m_labels[0]) & (labels <= m_labels[-1])
+        market_returns[inside] = np.where(m_labels[pos] == labels, m_returns[pos], 0.0)[inside]
+
+    hi = np.arange(len(labels))
+    lo, starts = window_starts(labels, window)
+    span_days = (labels - starts) / np.timedelta64(1, 'D')
+    covered_days = (labels - labels[lo]) / np.timedelta64(1, 'D')
+    n = (hi - lo).astype(float)
+    full = (covered_days >= MIN_COVERAGE * span_days) & (n > 1)
+
+    # Centre before summing so the running sums of squares do not lose precision
+    r_shift = returns[1:].mean() if len(returns) > 1 else 0.0
+    r = np.nan_to_num(returns - r_shift)
+    # The first bin never enters a window's returns, so only later bins need a benchmark return
+    m_valid = ~np.isnan(market_returns)
+    m_valid[0] = True
+    m_shift = market_returns[1:][m_valid[1:]].mean() if m_valid[1:].any() else 0.0
+    m = np.where(m_valid, np.nan_to_num(market_returns - m_shift), 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sum_r = _window_sums(r, lo, hi)
+        mean_r = sum_r / n
+        var_r = _window_sums(r * r, lo, hi) / n - mean_r ** 2
+        var_r = np.maximum(var_r, 0.0)
+        mean_return = mean_r + r_shift
+        volatility = np.sqrt(var_r * n / (n - 1)) * np.sqrt(annual_rate) * 100
+        sharpe = np.where(var_r > 0, (mean_return - risk_free_rate / annual_rate) * annual_rate
+                          / (np.sqrt(var_r) * np.sqrt(annual_rate)), np.nan)
+
+        mean_m = _window_sums(m, lo, hi) / n
+        var_m = _window_sums(m * m, lo, hi) / n - mean_m ** 2
+        cov = _window_sums(r * m, lo, hi) / n - mean_r * mean_m
+        market_complete = _window_sums((~m_valid).astype(float), lo, hi) == 0
+        beta = np.where(market_complete & (var_m > 0), cov / var_m, np.nan)
+
+        days = covered_days
+        years = np.where(days <= 365.25, 1, np.round(days / 365.25, 1))
+        cagr = ((close / close[lo]) ** (1 / years) - 1) * 100
+
+    max_dd = rolling_max_drawdown(close, lo) * 100
+    drawdown = rolling_drawdown(close, lo) * 100
+
+    frame = pd.DataFrame({
+        'Date': labels,
+        'Close': close,
+        'CAGR': cagr,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe,
+        'beta_value': beta * 100,
+        'Maximum_Drawdown': max_dd,
+        'Drawdown': drawdown,
+    })
+    metric_columns = frame.columns[2:]
+    frame.loc[~full, metric_columns] = np.nan
+    return frame
+
+
+# Rolling metrics for every fund of the partitioned frame (see partition.py), one frame per fund
+def iter_rolling_metrics(df, fund_slices, market, window='3Y', freq='daily', risk_free_rate=0.06,
+                         meta_columns=('Fund', 'scheme_category', 'scheme_code')):
+    from window_engine import SeriesArrays
+
+    dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+    close = df['Close'].to_numpy(dtype=float)
+    meta_columns = [col for col in meta_columns if col in df.columns]
+    for Fund, (start, stop) in fund_slices.items():
+        frame = rolling_metrics(SeriesArrays(dates[start:stop], close[start:stop]), market,
+                                window, freq, risk_free_rate)
+        if frame is None:
+            yield Fund, None
+            continue
+        for col in reversed(meta_columns):
+            frame.insert(0, col, df[col].iat[start])
+        frame.insert(len(meta_columns), 'window', window)
+        yield Fund, frame.dropna(subset=['CAGR'])
@@ -0,0 +1,92 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from profiler import stage
+
+# Run manifest for checkpointed Final.py runs, kept next to the output as <output>.manifest.json.
+# It records the input fingerprint and run parameters, the funds whose rows are safely on disk
+# ("completed") and the funds that produced no rows, with the reason ("failed").
+# A fund is only marked completed after the result sink has flushed its rows, so after a crash
+# the manifest never claims more than the output holds; --resume then skips completed funds and
+# retries the rest.
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def manifest_path(output):
+    return output.rstrip('/\\') + MANIFEST_SUFFIX
+
+
+# Size and sha256 of the input: a CSV file, or every file of a dataset directory in path order
+def input_fingerprint(path, block_size=1 << 20):
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+    digest = hashlib.sha256()
+    for file_path in files:
+        if os.path.isdir(path):
+            digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+    return {'size': sum(os.path.getsize(file_path) for file_path in files), 'sha256': digest.hexdigest()}
+
+
+class RunManifest:
+    def __init__(self, path, fingerprint, parameters, completed=None, failed=None, started=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.parameters = parameters
+        self.completed = set(completed or [])
+        self.failed = dict(failed or {})
+        self.started = started or datetime.now().isoformat(timespec='seconds')
+        self.status = 'running'
+        self._pending = {}
+
+    # The manifest of an interrupted run with the same input and parameters, if resume is asked
+    # for and one exists; otherwise a fresh manifest
+    @classmethod
+    def open(cls, path, fingerprint, parameters, resume=False):
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('fingerprint') == fingerprint and saved.get('parameters') == parameters:
+                return cls(path, fingerprint, parameters, saved.get('completed'), saved.get('failed'),
+                           saved.get('started')), True
+        return cls(path, fingerprint, parameters), False
+
+    # Per-fund outcome of a finished chunk: None for success, else the error text.
+    # Outcomes stay pending until commit(), i.e. until their rows have been flushed.
+    def record(self, status):
+        self._pending.update(status)
+
+    def commit(self):
+        for Fund, error in self._pending.items():
+            if error is None:
+                self.completed.add(Fund)
+                self.failed.pop(Fund, None)
+            else:
+                self.failed[Fund] = error
+        self._pending = {}
+        with stage('manifest_commit'):
+            self.save()
+
+    def finish(self):
+        self.status = 'complete'
+        self.commit()
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'fingerprint': self.fingerprint,
+                'parameters': self.parameters,
+                'status': self.status,
+                'started': self.started,
+                'updated': datetime.now().isoformat(timespec='seconds'),
+                'completed': sorted(self.completed),
+                'failed': dict(sorted(self.failed.items())),
+            }, f, indent=1)
+        os.replace(tmp_path, self.path)
@@ -2,20 +2,37 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import os
+from dataset import read_table
 
 st.set_page_config(page_title="Risk vs Returns Scatter Plot", layout="wide")  # <-- MUST BE FIRST
 # Sidebar controls
 st.sidebar.title("Filters")
 
+# Columns the scatter plot uses; the Fund Details table reads the full rows of its selection
+APP_COLUMNS = ['Fund', 'Category_Name', 'timeline', 'result_type', 'CAGR', 'std']
+DETAIL_KEYS = ['Fund', 'Category_Name', 'timeline', 'result_type']
+
+def data_path():
+    # Prefer the partitioned dataset (python dataset.py final_data.csv data/final_data --kind metrics)
+    data_dir = os.path.join(os.path.dirname(__file__), "data")
+    path = os.path.join(data_dir, "final_data")
+    if not os.path.isdir(path):
+        path = os.path.join(data_dir, "final_data.csv")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Data file not found at: {path}")
+    return path
+
 #Load data
 @st.cache_data
-def load_data():
-    data_path = os.path.join(os.path.dirname(__file__), "data", "final_data.csv")
-    if not os.path.exists(data_path):
-        raise FileNotFoundError(f"Data file not found at: {data_path}")
-    return pd.read_csv(data_path)
+def load_data(result_type):
+    # Only the selected result_type's partitions and the app's columns are read
+    return read_table(data_path(), columns=APP_COLUMNS, filters=[('result_type', '==', result_type)], categories=False)
 
-df_final = load_data()
+@st.cache_data
+def load_details(result_type, timeline):
+    # Every metric, but only for the rows of the selected result_type and timeline
+    return read_table(data_path(), filters=[('result_type', '==', result_type), ('timeline', '==', timeline)],
+                      categories=False)
 
 # Info button for Result Type
 with st.sidebar.expander("ℹ️ About Result Type", expanded=False):
@@ -34,7 +51,7 @@ result_type = st.sidebar.selectbox(
     format_func=lambda x: "Till Date" if x == "Till_date" else "Default"
 )
 
-df_filtered_result = df_final[df_final['result_type'] == result_type]
+df_filtered_result = load_data(result_type)
 
 categories = ['Portfolio', 'All'] + sorted(df_filtered_result['Category_Name'].unique())
 selected_categories = st.sidebar.multiselect(
@@ -228,4 +245,8 @@ st.plotly_chart(fig, use_container_width=True)
 
 # Fund details table
 st.subheader("Fund Details")
-st.dataframe(df_filtered.reset_index(drop=True), use_container_width=True)
+avg_columns = [col for col in df_filtered.columns if col.endswith("_Category_Avg")]
+df_details = load_details(result_type, selected_timeline)
+df_details = df_filtered[DETAIL_KEYS + avg_columns].merge(df_details, on=DETAIL_KEYS, how="left")
+df_details = df_details[[col for col in df_details.columns if col not in avg_columns] + avg_columns]
+st.dataframe(df_details.reset_index(drop=True), use_container_width=True)
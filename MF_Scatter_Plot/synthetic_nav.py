@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Seeded synthetic NAV history in the layout of final.csv (Date, Close, Fund, scheme_category,
+# scheme_code, Category, fund_house), for benchmarks and offline checks. The benchmark is a
+# geometric random walk over business days; every fund follows a one-factor model
+#   r_fund = alpha + beta * r_benchmark + noise
+# with its own alpha, beta and noise level, so betas, captures and drawdowns are realistic.
+# Like the real data, funds launch on different dates, miss some NAV days, and a few funds are
+# too young for the longer timelines. The same arguments always give the same frame.
+
+BENCHMARK = 'Nifty 50'
+BENCHMARK_CODE = 100000
+CATEGORIES = [
+    ('Equity Scheme - Large Cap Fund', 'Equity Scheme', 1.0),
+    ('Equity Scheme - Mid Cap Fund', 'Equity Scheme', 1.2),
+    ('Equity Scheme - Small Cap Fund', 'Equity Scheme', 1.4),
+    ('Hybrid Scheme - Balanced Advantage', 'Hybrid Scheme', 0.5),
+    ('Debt Scheme - Short Duration Fund', 'Debt Scheme', 0.05),
+]
+FUND_HOUSES = ['AMC A', 'AMC B', 'AMC C', 'AMC D', 'AMC E', 'AMC F']
+
+
+def synthetic_nav_frame(n_funds=50, years=10, seed=0, end='2025-06-18', missing=0.03,
+                        benchmark=BENCHMARK):
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(end=end, periods=int(252 * years))
+
+    # Benchmark: ~12% a year, ~16% volatility, ~2% of trading days absent
+    market_days = rng.random(len(days)) > 0.02
+    market_returns = rng.normal(0.00045, 0.01, len(days))
+    frames = [_frame(days[market_days], 10000 * np.cumprod(1 + market_returns[market_days]), benchmark,
+                     'Benchmark ' + benchmark, BENCHMARK_CODE, 'Benchmark', 'Benchmark ' + benchmark)]
+
+    for i in range(n_funds):
+        category, group, beta = CATEGORIES[i % len(CATEGORIES)]
+        beta = beta * rng.uniform(0.8, 1.2)
+        alpha = rng.normal(0.00005, 0.00005)
+        noise = rng.normal(0, rng.uniform(0.001, 0.006), len(days))
+        returns = alpha + beta * market_returns + noise
+        # A quarter of the funds launch in the second half of the period
+        start = int(rng.integers(len(days) // 2, len(days) - 300)) if rng.random() < 0.25 else 0
+        keep = np.zeros(len(days), dtype=bool)
+        keep[start:] = rng.random(len(days) - start) > missing
+        close = 10 * np.cumprod(1 + returns[keep])
+        frames.append(_frame(days[keep], close, f"Synthetic Fund {i:04d} - Direct Plan - Growth", category,
+                             120000 + i, group, FUND_HOUSES[i % len(FUND_HOUSES)]))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _frame(dates, close, Fund, scheme_category, scheme_code, Category, fund_house):
+    return pd.DataFrame({
+        'Date': dates,
+        'Close': close,
+        'Fund': Fund,
+        'scheme_category': scheme_category,
+        'scheme_code': scheme_code,
+        'Category': Category,
+        'fund_house': fund_house,
+    })
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic final.csv for offline runs.")
+    parser.add_argument('output')
+    parser.add_argument('--funds', type=int, default=50)
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    df = synthetic_nav_frame(args.funds, args.years, args.seed)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} rows for {args.funds} funds to {args.output}")
@@ -0,0 +1,144 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import Final
+from Fund_Analysis import Fund_Analysis
+from result_sink import read_results, normalize_results
+from synthetic_nav import synthetic_nav_frame, BENCHMARK
+
+# End-to-end check of the Final.py execution paths on a small synthetic universe: the panel and
+# per-fund loop metrics, the out-of-core mode and an incremental update must all give the rows
+# Fund_Analysis gives fund by fund. Run with python -m pytest from MF_Scatter_Plot.
+# test_data/baseline_results.csv pins those rows to the original implementation: it is the
+# output of the per-window Fund_Analysis this engine replaced (filter, frequency() resample,
+# pct_change, merge, calculate_risk_metrics) on the same synthetic universe, written once and
+# never regenerated from the current code.
+
+N_FUNDS = 6
+YEARS = 4
+ROW_KEY = ['Fund', 'timeline', 'result_type']
+BASELINE_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data', 'baseline_results.csv')
+
+
+@pytest.fixture(scope='module')
+def nav():
+    return synthetic_nav_frame(N_FUNDS, YEARS, seed=7)
+
+
+@pytest.fixture(scope='module')
+def expected(nav):
+    benchmark = nav[nav['Fund'] == BENCHMARK]
+    frames = []
+    for Fund, df_fund in nav.groupby('Fund', sort=False):
+        for result_type in Final.RESULT_TYPES:
+            result, _ = Fund_Analysis(df_fund, Fund, benchmark, 0.06, result_type)
+            if result is not None:
+                frames.append(result)
+    return sorted_rows(normalize_results(pd.concat(frames, ignore_index=True)))
+
+
+def sorted_rows(df):
+    return df.sort_values(ROW_KEY, kind='stable').reset_index(drop=True)
+
+
+def write_input(df, path):
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def run_final(input_path, output_path, *options):
+    Final.main(['--input', input_path, '--output', str(output_path), '--workers', '2', *options])
+    return sorted_rows(read_results(str(output_path)))
+
+
+def assert_same_rows(actual, expected):
+    assert len(actual) > 0
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False, rtol=1e-9)
+
+
+def test_fund_analysis_matches_baseline(expected):
+    assert_same_rows(expected, sorted_rows(read_results(BASELINE_RESULTS)))
+
+
+@pytest.mark.parametrize('options', [
+    ('--metrics', 'panel'),
+    ('--metrics', 'loop'),
+    ('--metrics', 'panel', '--executor', 'thread'),
+], ids=['panel', 'loop', 'thread'])
+def test_full_run_matches_fund_analysis(nav, expected, tmp_path, options):
+    input_path = write_input(nav, tmp_path / 'final.csv')
+    assert_same_rows(run_final(input_path, tmp_path / 'final_data.csv', *options), expected)
+
+
+def test_out_of_core_matches_fund_analysis(nav, expected, tmp_path):
+    input_path = write_input(nav, tmp_path / 'final.csv')
+    # A 1 MB budget splits the six funds over several buckets
+    actual = run_final(input_path, tmp_path / 'final_data.csv', '--memory-budget', '1')
+    assert_same_rows(actual, expected)
+
+
+# Within the month ('default' anchors hold, only 'All' and Till_date move) and across a month end
+@pytest.mark.parametrize('days', [4, 45])
+def test_incremental_update_matches_fund_analysis(nav, expected, tmp_path, days):
+    output = tmp_path / 'final_data.csv'
+    cutoff = nav['Date'].max() - pd.Timedelta(days=days)
+    run_final(write_input(nav[nav['Date'] <= cutoff], tmp_path / 'old.csv'), output)
+    actual = run_final(write_input(nav, tmp_path / 'final.csv'), output, '--incremental')
+    assert_same_rows(actual, expected)
+
+
+def test_incremental_drops_removed_funds(nav, expected, tmp_path):
+    output = tmp_path / 'final_data.csv'
+    run_final(write_input(nav, tmp_path / 'final.csv'), output)
+    removed = np.sort(nav.loc[nav['Fund'] != BENCHMARK, 'Fund'].unique())[0]
+    actual = run_final(write_input(nav[nav['Fund'] != removed], tmp_path / 'final.csv'), output, '--incremental')
+    assert_same_rows(actual, sorted_rows(expected[expected['Fund'] != removed]))
+
+
+def test_rolling_leaves_metrics_output_alone(nav, expected, tmp_path):
+    output = tmp_path / 'final_data.csv'
+    input_path = write_input(nav, tmp_path / 'final.csv')
+    run_final(input_path, output)
+    Final.main(['--input', input_path, '--output', str(output), '--rolling', '1Y'])
+    assert (tmp_path / 'final_data_rolling_1Y.csv').exists()
+    assert_same_rows(sorted_rows(read_results(str(output))), expected)
+    with pytest.raises(SystemExit):
+        Final.main(['--input', input_path, '--output', str(output), '--rolling', '1Y', '--rolling-output', str(output)])
+
+
+def test_benchmark_map_leaves_metrics_output_alone(nav, expected, tmp_path):
+    output = tmp_path / 'final_data.csv'
+    input_path = write_input(nav, tmp_path / 'final.csv')
+    run_final(input_path, output)
+    Final.main(['--input', input_path, '--output', str(output), '--benchmark-map', 'default'])
+    benchmarks = read_results(str(tmp_path / 'final_data_benchmarks.csv'))
+    assert set(benchmarks['Benchmark']) == {BENCHMARK}
+    assert_same_rows(sorted_rows(read_results(str(output))), expected)
+
+
+def test_incremental_keeps_old_rows_of_failed_fund(nav, expected, tmp_path, monkeypatch):
+    import fund_pool
+
+    output = tmp_path / 'final_data.csv'
+    cutoff = nav['Date'].max() - pd.Timedelta(days=45)
+    old = run_final(write_input(nav[nav['Date'] <= cutoff], tmp_path / 'old.csv'), output)
+    failing = np.sort(nav.loc[nav['Fund'] != BENCHMARK, 'Fund'].unique())[0]
+    analyse_fund = fund_pool.analyse_fund
+
+    # Only the Till_date pass of one fund fails; its default rows must not be merged
+    def flaky(fund, market, meta, risk_free_rate=0.06, result_type='default', **kwargs):
+        if meta['Fund'] == failing and result_type == 'Till_date':
+            raise ValueError("flaky")
+        return analyse_fund(fund, market, meta, risk_free_rate, result_type, **kwargs)
+
+    monkeypatch.setattr(fund_pool, 'analyse_fund', flaky)
+    input_path = write_input(nav, tmp_path / 'final.csv')
+    actual = run_final(input_path, output, '--incremental', '--metrics', 'loop', '--executor', 'thread')
+    assert not actual.duplicated(ROW_KEY).any()
+    assert_same_rows(sorted_rows(actual[actual['Fund'] == failing]), sorted_rows(old[old['Fund'] == failing]))
+    assert_same_rows(sorted_rows(actual[actual['Fund'] != failing]), sorted_rows(expected[expected['Fund'] != failing]))
+
+    # The failed fund kept its old anchors, so the next run retries it
+    monkeypatch.setattr(fund_pool, 'analyse_fund', analyse_fund)
+    assert_same_rows(run_final(input_path, output, '--incremental'), expected)
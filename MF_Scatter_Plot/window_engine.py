@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from profiler import stage
+
+# Single-pass window engine for Fund_Analysis. A NAV series is sorted and turned into NumPy
+# arrays once, together with the daily/weekly/monthly bin of every row. Each analysis window
+# then becomes a pair of binary searches on the date array, and its resampled series is read
+# straight from the precomputed bin boundaries - no boolean masks, resamples or merges per window.
+#
+# The output matches frequency() + pct_change() + merge() on the filtered data: bins are the
+# calendar bins of resample('D'/'W'/'M'), a bin cut by the window end keeps its last NAV inside
+# the window, empty bins are skipped (calculate_risk_metrics drops them anyway), and a fund bin
+# with no benchmark NAV gets a 0 market return, as pandas' padded pct_change gives.
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+META_COLUMNS = ['Fund', 'scheme_category', 'scheme_code', 'Category', 'fund_house']
+
+
+def date_ranges(max_date):
+    return {
+        '1W': (max_date - relativedelta(weeks=1), max_date),
+        '3W': (max_date - relativedelta(weeks=3), max_date),
+        '1M': (max_date - relativedelta(months=1), max_date),
+        '3M': (max_date - relativedelta(months=3), max_date),
+        '6M': (max_date - relativedelta(months=6), max_date),
+        '1Y': (max_date - relativedelta(years=1), max_date),
+        '2Y': (max_date - relativedelta(years=2), max_date),
+        '3Y': (max_date - relativedelta(years=3), max_date),
+        '5Y': (max_date - relativedelta(years=5), max_date),
+        '7Y': (max_date - relativedelta(years=7), max_date),
+        '10Y': (max_date - relativedelta(years=10), max_date),
+        '15Y': (max_date - relativedelta(years=15), max_date),
+        'All': None,
+        '2025_TD': ('2025-01-01', max_date),
+        '2024': ('2024-01-01', '2024-12-31'),
+        '2023': ('2023-01-01', '2023-12-31'),
+        '2022': ('2022-01-01', '2022-12-31'),
+        '2021': ('2021-01-01', '2021-12-31'),
+        '2020': ('2020-01-01', '2020-12-31'),
+        '2019': ('2019-01-01', '2019-12-31'),
+        '2018': ('2018-01-01', '2018-12-31'),
+    }
+
+
+def timeline_frequency(timeline):
+    if timeline in ['1W', '3W', '1M']:
+        return 'daily'
+    elif timeline in ['3M', '6M', '1Y', '2Y', '2025_TD', '2024', '2023', '2022', '2021', '2020', '2019', '2018']:
+        return 'weekly'
+    return 'monthly'
+
+
+# Label of the resample bin each date falls in ('D', 'W' = week ending Sunday, 'M' = month end)
+def bin_labels(dates, freq):
+    dates = pd.DatetimeIndex(dates).normalize()
+    if freq == 'daily':
+        return dates
+    elif freq == 'weekly':
+        return dates + pd.to_timedelta((6 - dates.weekday) % 7, unit='D')
+    elif freq == 'monthly':
+        return dates + pd.offsets.MonthEnd(0)
+    raise ValueError("Frequency must be 'daily', 'weekly', or 'monthly'.")
+
+
+class SeriesArrays:
+    def __init__(self, dates, close):
+        dates = pd.to_datetime(np.asarray(dates), errors='coerce').to_numpy(dtype='datetime64[ns]')
+        close = np.asarray(close, dtype=float)
+        valid = ~(np.isnat(dates) | np.isnan(close))
+        if not valid.all():
+            dates, close = dates[valid], close[valid]
+        # Partitioned input is already in date order, so the sort is usually skipped
+        if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+            order = np.argsort(dates, kind='stable')
+            dates, close = dates[order], close[order]
+        self.dates = dates
+        self.close = close
+        self.labels = {}
+        self.bin_ends = {}
+        for freq in FREQUENCIES:
+            labels = bin_labels(self.dates, freq).to_numpy()
+            self.labels[freq] = labels
+            # Rows that close a bin (the last row of the series is handled per window)
+            self.bin_ends[freq] = np.flatnonzero(labels[1:] != labels[:-1])
+
+    @classmethod
+    def from_frame(cls, df, date_col='Date', value_col='Close'):
+        return cls(df[date_col], df[value_col])
+
+    def __len__(self):
+        return len(self.dates)
+
+    def bounds(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), 'left')
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), 'right')
+        return int(lo), int(hi)
+
+    def tenure_days(self, lo, hi):
+        return int((self.dates[hi - 1] - self.dates[lo]) // np.timedelta64(1, 'D'))
+
+    # Bin labels and last close of every non-empty bin among rows [lo, hi)
+    def resampled(self, freq, lo, hi):
+        ends = self.bin_ends[freq]
+        i = np.searchsorted(ends, lo, 'left')
+        j = np.searchsorted(ends, hi - 1, 'left')
+        idx = np.append(ends[i:j], hi - 1)
+        return self.labels[freq][idx], self.close[idx]
+
+
+def simple_returns(close):
+    returns = np.empty(len(close))
+    returns[0] = np.nan
+    returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+
+# Market returns for the fund bins inside the benchmark's window: (keep, market_returns), where
+# keep flags the fund bins within the benchmark's first and last label, and a kept bin with no
+# benchmark NAV gets a 0 return. None when the benchmark has no window or no bin overlaps.
+def align_market(f_labels, market_window):
+    if market_window is None:
+        return None
+    m_labels, m_returns = market_window
+    keep = (f_labels >= m_labels[0]) & (f_labels <= m_labels[-1])
+    if not keep.any():
+        return None
+    pos = np.searchsorted(m_labels, f_labels[keep])
+    matched = m_labels[pos] == f_labels[keep]
+    return keep, np.where(matched, m_returns[pos], 0.0)
+
+
+# Resampled fund returns for one window aligned with the benchmark's (labels, returns) for the
+# same window. Returns (dates, close, returns, market_returns) or None when there is no overlap.
+# This is the resample + pct_change + merge stage of the old per-window code.
+def window_returns(fund, freq, fund_bounds, market_window):
+    f_lo, f_hi = fund_bounds
+    if f_hi <= f_lo or market_window is None:
+        return None
+    with stage('resample'):
+        f_labels, f_close = fund.resampled(freq, f_lo, f_hi)
+    with stage('merge'):
+        aligned = align_market(f_labels, market_window)
+    if aligned is None:
+        return None
+    keep, market_returns = aligned
+    return f_labels[keep], f_close[keep], simple_returns(f_close)[keep], market_returns
+
+
+# Yields (timeline, freq, start_date, end_date, fund_bounds) for every window that passes the
+# Fund_Analysis tenure rule (the fund must cover 95% of a fixed window); 'All' has no dates.
+# timelines optionally restricts the output to a subset of the date_ranges keys.
+def fund_windows(fund, max_date, timelines=None):
+    for timeline, date_range in date_ranges(max_date).items():
+        if timelines is not None and timeline not in timelines:
+            continue
+        if isinstance(date_range, tuple):
+            start_date, end_date = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+            fund_bounds = fund.bounds(start_date, end_date)
+            if fund_bounds[1] <= fund_bounds[0]:
+                continue
+            duration_years = (end_date - start_date).days
+            if duration_years * 0.95 > fund.tenure_days(*fund_bounds):
+                continue
+        else:
+            start_date = end_date = None
+            fund_bounds = (0, len(fund))
+        yield timeline, timeline_frequency(timeline), start_date, end_date, fund_bounds
+
+
+# Yields (timeline, freq, dates, close, returns, market_returns) for every window of
+# fund_windows() that overlaps the benchmark.
+# benchmark is a BenchmarkContext, which serves its side of each window from a cache.
+def iter_windows(fund, benchmark, max_date, timelines=None):
+    for timeline, freq, start_date, end_date, fund_bounds in fund_windows(fund, max_date, timelines):
+        with stage('resample_benchmark'):
+            market_window = benchmark.window(freq, start_date, end_date)
+        aligned = window_returns(fund, freq, fund_bounds, market_window)
+        if aligned is None:
+            continue
+        yield (timeline, freq) + aligned
+
+
+def window_frame(meta, dates, close, returns, market_returns):
+    return pd.DataFrame({
+        'Date': dates,
+        'Close': close,
+        'Return': returns,
+        'Market Return': market_returns,
+        **meta,
+    })